@@ -0,0 +1,314 @@
+"""
+    ACP (Analyse en composantes principales) hors mémoire
+
+    Ajuste une ACP sur une matrice qui ne tient pas en mémoire (fichier .npy relu en
+    mémoire partagée, np.memmap, ou itérable de blocs de lignes), puis projette les
+    individus bloc par bloc. Le résultat expose les mêmes attributs qu'un objet
+    sklearn.decomposition.PCA (components_, explained_variance_, explained_variance_ratio_,
+    mean_...) et s'utilise donc directement avec print_acp.correlation_graph et
+    print_acp.display_factorial_planes.
+
+    Trois méthodes :
+    - 'covariance' : une passe qui accumule la matrice de covariance (d x d), puis sa
+      décomposition exacte. Adaptée jusqu'à quelques milliers de features (ex : 1280 features
+      MobileNetV2).
+    - 'randomized' : itérations de sous-espace randomisées sur la covariance, une passe sur
+      les données par itération, mémoire en d x (n_components + n_oversamples).
+      Pour un très grand nombre de features (TF-IDF).
+    - 'incremental' : sklearn.decomposition.IncrementalPCA, alimentée bloc par bloc.
+
+    Exemple :
+        pca = OutOfCorePCA(n_components=50, batch_size=50_000).fit('features.npy')
+        X_projected = pca.transform('features.npy', out='features_pca.npy')
+        correlation_graph(pca, [0, 1], features)
+"""
+
+import numpy as np
+from sklearn.decomposition import IncrementalPCA
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _open(X):
+    """
+    Ouvre un chemin .npy en mémoire partagée ; les autres entrées sont retournées telles quelles.
+    """
+    if isinstance(X, str):
+        return np.load(X, mmap_mode='r')
+    return X
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def iter_batches(X, batch_size=10_000, dtype=np.float64):
+    """
+    Parcourt une matrice par blocs de lignes.
+
+    Args:
+    - X (np.ndarray, np.memmap, pd.DataFrame, str or iterable): la matrice, le chemin d'un fichier .npy
+      (relu en mémoire partagée) ou un itérable de blocs (tableaux ou DataFrames, ex : pd.read_csv(..., chunksize=...)).
+    - batch_size (int): nombre de lignes par bloc pour une matrice, default = 10_000.
+    - dtype (np.dtype): type des blocs retournés, default = np.float64.
+
+    Yields:
+    - np.ndarray: chaque bloc, de forme (n_lignes, n_features).
+    """
+    X = _open(X)
+    if hasattr(X, 'shape') and len(getattr(X, 'shape', ())) == 2:
+        for start in range(0, X.shape[0], batch_size):
+            yield np.asarray(X[start:start + batch_size], dtype=dtype)
+    else:
+        for batch in X:
+            yield np.asarray(batch, dtype=dtype)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _rebatch(batches, min_rows):
+    """
+    Regroupe des blocs trop petits pour qu'aucun bloc n'ait moins de `min_rows` lignes (sauf s'il n'y en a pas assez au total).
+    """
+    pending = []
+    n_pending = 0
+    for batch in batches:
+        pending.append(batch)
+        n_pending += len(batch)
+        if n_pending >= min_rows:
+            yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+            pending, n_pending = [], 0
+    if pending:
+        yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class OutOfCorePCA:
+    """
+    ACP ajustée et appliquée bloc par bloc, compatible avec les attributs de sklearn.decomposition.PCA.
+
+    Args:
+    - n_components (int): nombre de composantes.
+    - method (str): 'covariance', 'randomized', 'incremental' ou 'auto' (covariance jusqu'à
+      max_covariance_features features, randomized au delà), default = 'auto'.
+    - batch_size (int): nombre de lignes lues à la fois, default = 10_000.
+    - whiten (bool): diviser les projections par l'écart type de chaque composante, default = False.
+    - n_oversamples (int): colonnes supplémentaires de l'espace aléatoire (randomized), default = 10.
+    - n_iter (int): nombre d'itérations de sous-espace, une passe chacune (randomized), default = 4.
+    - random_state (int): graine de la méthode randomized, default = None.
+    - max_covariance_features (int): nombre maximal de features pour la méthode 'covariance' en mode auto, default = 4096.
+
+    Attributes:
+    - mean_ (np.ndarray): moyenne de chaque feature.
+    - components_ (np.ndarray): axes principaux, de forme (n_components, n_features).
+    - explained_variance_ (np.ndarray): variance expliquée par chaque composante.
+    - explained_variance_ratio_ (np.ndarray): part de l'inertie totale expliquée par chaque composante.
+    - singular_values_ (np.ndarray): valeurs singulières de la matrice centrée.
+    - n_samples_ (int), n_features_in_ (int), n_components_ (int).
+    """
+
+    def __init__(self,
+                 n_components,
+                 method='auto',
+                 batch_size=10_000,
+                 whiten=False,
+                 n_oversamples=10,
+                 n_iter=4,
+                 random_state=None,
+                 max_covariance_features=4096):
+        self.n_components = n_components
+        self.method = method
+        self.batch_size = batch_size
+        self.whiten = whiten
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.max_covariance_features = max_covariance_features
+
+    def fit(self, X):
+        """
+        Ajuste l'ACP.
+
+        Les méthodes 'covariance' et 'incremental' parcourent X une seule fois : un générateur
+        de blocs suffit. Seule la méthode 'randomized' relit X (une passe pour les moments, puis
+        une par itération) : l'itérable de blocs doit alors pouvoir être relu (une liste, pas un
+        générateur). En mode 'auto', un itérable sans attribut `shape` utilise 'covariance'.
+
+        Args:
+        - X: la matrice (voir iter_batches).
+
+        Returns:
+        - OutOfCorePCA: l'objet lui-même.
+        """
+        X = _open(X)
+        method = self.method
+        if method == 'auto':
+            n_features = X.shape[1] if hasattr(X, 'shape') else None
+            method = 'covariance' if n_features is None or n_features <= self.max_covariance_features else 'randomized'
+        if method not in ('covariance', 'randomized', 'incremental'):
+            raise ValueError(f"méthode inconnue : {method}")
+
+        if method == 'incremental':
+            self._fit_incremental(X)
+        else:
+            # Première passe : moyenne et inertie totale, puis la covariance si elle est demandée
+            scatter = self._fit_moments(X, with_scatter=method == 'covariance')
+            if method == 'covariance':
+                eigenvalues, eigenvectors = np.linalg.eigh(scatter)
+                order = np.argsort(eigenvalues)[::-1][:self.n_components]
+                self._set_components(eigenvalues[order], eigenvectors[:, order].T)
+            else:
+                self._fit_randomized(X)
+
+        self.method_ = method
+        return self
+
+    def _fit_moments(self, X, with_scatter):
+        """
+        Calcule la moyenne, l'inertie totale et, si demandé, la matrice de dispersion (X - mean)'(X - mean).
+
+        Les blocs sont combinés avec la formule de Chan et al. (moyennes et dispersions par bloc),
+        plus stable que l'accumulation de X'X.
+        """
+        n_samples = 0
+        mean = None
+        total_variance = 0.0
+        scatter = None
+        for batch in iter_batches(X, self.batch_size):
+            n_batch = len(batch)
+            if not n_batch:
+                continue
+            batch_mean = batch.mean(axis=0)
+            centered = batch - batch_mean
+            if mean is None:
+                mean = np.zeros(batch.shape[1])
+                variances = np.zeros(batch.shape[1])
+                if with_scatter:
+                    scatter = np.zeros((batch.shape[1], batch.shape[1]))
+
+            delta = batch_mean - mean
+            weight = n_samples * n_batch / (n_samples + n_batch)
+            variances += (centered ** 2).sum(axis=0) + delta ** 2 * weight
+            if with_scatter:
+                scatter += centered.T @ centered + np.outer(delta, delta) * weight
+            mean += delta * n_batch / (n_samples + n_batch)
+            n_samples += n_batch
+
+        if n_samples < 2:
+            raise ValueError("au moins 2 individus sont nécessaires")
+        self.mean_ = mean
+        self.n_samples_ = n_samples
+        self.n_features_in_ = len(mean)
+        self._total_variance = variances.sum() / (n_samples - 1)
+        return scatter
+
+    def _scatter_product(self, X, Q):
+        """
+        Calcule (X - mean)'(X - mean) Q en une passe sur les données, sans former la matrice d x d.
+        """
+        product = np.zeros_like(Q)
+        for batch in iter_batches(X, self.batch_size):
+            centered = batch - self.mean_
+            product += centered.T @ (centered @ Q)
+        return product
+
+    def _fit_randomized(self, X):
+        """
+        Itérations de sous-espace randomisées (Halko et al.) sur la matrice de dispersion, une passe par itération.
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_random = min(self.n_components + self.n_oversamples, self.n_features_in_)
+
+        Q, _ = np.linalg.qr(rng.standard_normal((self.n_features_in_, n_random)))
+        for _ in range(self.n_iter):
+            Q, _ = np.linalg.qr(self._scatter_product(X, Q))
+
+        # Décomposition exacte de la dispersion restreinte au sous-espace trouvé
+        small = Q.T @ self._scatter_product(X, Q)
+        eigenvalues, eigenvectors = np.linalg.eigh((small + small.T) / 2)
+        order = np.argsort(eigenvalues)[::-1][:self.n_components]
+        self._set_components(eigenvalues[order], (Q @ eigenvectors[:, order]).T)
+
+    def _fit_incremental(self, X):
+        """
+        Ajustement par sklearn.decomposition.IncrementalPCA, bloc par bloc.
+        """
+        model = IncrementalPCA(n_components=self.n_components, whiten=self.whiten)
+        for batch in _rebatch(iter_batches(X, self.batch_size), self.n_components):
+            model.partial_fit(batch)
+
+        self.mean_ = model.mean_
+        self.n_samples_ = int(model.n_samples_seen_)
+        self.n_features_in_ = len(model.mean_)
+        self._total_variance = model.var_.sum() * self.n_samples_ / (self.n_samples_ - 1)
+        self._set_components(model.explained_variance_ * (self.n_samples_ - 1), model.components_)
+
+    def _set_components(self, scatter_eigenvalues, components):
+        """
+        Renseigne les attributs de sklearn.decomposition.PCA à partir des valeurs propres de la dispersion.
+        """
+        # Signe déterministe : la plus forte contribution de chaque axe est positive
+        strongest = np.abs(components).argmax(axis=1)
+        signs = np.sign(components[np.arange(len(components)), strongest])
+        signs[signs == 0] = 1
+
+        eigenvalues = np.clip(scatter_eigenvalues, 0, None)
+        self.components_ = components * signs[:, None]
+        self.explained_variance_ = eigenvalues / (self.n_samples_ - 1)
+        self.explained_variance_ratio_ = self.explained_variance_ / self._total_variance
+        self.singular_values_ = np.sqrt(eigenvalues)
+        self.n_components_ = len(components)
+
+    def _project(self, batch):
+        projected = (batch - self.mean_) @ self.components_.T
+        if self.whiten:
+            projected /= np.sqrt(self.explained_variance_)
+        return projected
+
+    def transform_batches(self, X):
+        """
+        Projette X bloc par bloc.
+
+        Yields:
+        - np.ndarray: la projection de chaque bloc, de forme (n_lignes, n_components).
+        """
+        for batch in iter_batches(X, self.batch_size):
+            yield self._project(batch)
+
+    def transform(self, X, out=None):
+        """
+        Projette X sur les composantes.
+
+        Args:
+        - X: la matrice (voir iter_batches).
+        - out (str or np.ndarray): fichier .npy créé en mémoire partagée, ou tableau à remplir,
+          qui reçoit la projection au fil des blocs, default = None (projection retournée en mémoire).
+
+        Returns:
+        - np.ndarray: la projection (un np.memmap si out est un chemin).
+        """
+        X = _open(X)
+        if out is None:
+            return np.concatenate(list(self.transform_batches(X)) or [np.empty((0, self.n_components_))])
+
+        if isinstance(out, str):
+            if not hasattr(X, 'shape'):
+                raise ValueError("out nécessite une matrice dont le nombre de lignes est connu")
+            out = np.lib.format.open_memmap(out, mode='w+', dtype=np.float64, shape=(X.shape[0], self.n_components_))
+        start = 0
+        for projected in self.transform_batches(X):
+            out[start:start + len(projected)] = projected
+            start += len(projected)
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
+
+    def fit_transform(self, X, out=None):
+        """
+        Ajuste l'ACP puis projette X (voir fit et transform).
+        """
+        return self.fit(X).transform(X, out=out)
+
+    def inverse_transform(self, X_projected):
+        """
+        Reconstruit les individus dans l'espace d'origine à partir de leur projection.
+        """
+        X_projected = np.asarray(X_projected, dtype=np.float64)
+        if self.whiten:
+            X_projected = X_projected * np.sqrt(self.explained_variance_)
+        return X_projected @ self.components_ + self.mean_
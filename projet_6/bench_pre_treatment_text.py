@@ -0,0 +1,741 @@
+"""
+    Benchmark des fonctions de pré traitement de texte
+
+    Deux modes :
+    - la comparaison des modes de tokenisation (iterrows, lignes, colonne) ;
+    - la suite complète (--suite), qui mesure chaque fonction publique de pre_treatment_text
+      sur des catalogues synthétiques de plusieurs tailles (lignes par seconde, pic de mémoire
+      résidente, pic d'allocations Python) et ajoute les résultats à un fichier JSON lines,
+      pour suivre les régressions d'une version à l'autre.
+
+    Exemple :
+        python bench_pre_treatment_text.py --rows 100000
+        python bench_pre_treatment_text.py --suite --label v2
+        python bench_pre_treatment_text.py --suite --large --label v2
+        python bench_pre_treatment_text.py --compare v1 v2
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from collections import Counter
+
+try:
+    import resource
+except ImportError:
+    # Module absent sous Windows : le pic de mémoire résidente n'est alors pas mesuré
+    resource = None
+
+import matplotlib
+matplotlib.use('Agg')
+
+import nltk
+import numpy as np
+import pandas as pd
+
+import pre_treatment_text as ptt
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Vocabulaire de base pour générer des descriptions proches de celles du catalogue Flipkart
+WORDS = ['analog', 'watch', 'men', 'women', 'cotton', 'kurta', 'printed', 'buy', 'online', 'price',
+         'best', 'genuine', 'product', 'delivery', 'free', 'shipping', 'cash', 'specification',
+         'color', 'black', 'blue', 'red', 'white', 'pack', 'set', 'baby', 'girl', 'boy', 'dress',
+         'showpiece', 'mug', 'ceramic', 'bed', 'sheet', 'double', 'floral', 'laptop', 'skin',
+         'sticker', 'rs', '1', '2', '3', '100', '499', 'x', 'cm', 'inch', 'warranty', 'model']
+
+# Syllabes des mots rares générés, qui forment la longue traîne du vocabulaire
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vi', 'so', 'pe', 'du', 'ga', 'ri']
+
+# Arborescence des catégories (les 7 catégories de premier niveau du catalogue Flipkart)
+CATEGORIES = {
+    'Home Furnishing': ['Bed Linen', 'Curtains & Accessories', 'Cushions, Pillows & Covers'],
+    'Baby Care': ['Baby Bath & Skin', 'Infant Wear', 'Baby Bedding'],
+    'Watches': ['Wrist Watches', 'Clocks'],
+    'Home Decor & Festive Needs': ['Showpieces', 'Wall Decor & Clocks', 'Candles & Fragrances'],
+    'Kitchen & Dining': ['Coffee Mugs', 'Cookware', 'Containers & Bottles'],
+    'Beauty and Personal Care': ['Fragrances', 'Makeup', 'Hair Care'],
+    'Computers': ['Laptop Accessories', 'Network Components', 'Tablet Accessories'],
+}
+
+# Stopwords utilisés par la suite (indépendants des corpus NLTK)
+STOPWORDS = frozenset({'men', 'women', 'rs', 'x', 'cm', 'buy', 'online', 'price', 'best'})
+
+# Tailles mesurées par défaut par la suite, et grandes tailles ajoutées avec --large
+SIZES = (1_000, 100_000)
+LARGE_SIZES = (10_000_000,)
+
+# Nombre de processus des cas parallèles (au moins 2, pour toujours mesurer le mode parallèle)
+N_JOBS = max(2, min(4, os.cpu_count() or 1))
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def make_vocabulary(n_rare=20_000):
+    """
+    Retourne le vocabulaire synthétique : WORDS suivis de `n_rare` mots générés à partir de SYLLABLES.
+    """
+    rare = []
+    for i in range(n_rare):
+        word, i = '', i + len(SYLLABLES)
+        while i:
+            i, syllable = divmod(i, len(SYLLABLES))
+            word += SYLLABLES[syllable]
+        rare.append(word)
+    return np.array(WORDS + rare, dtype=object)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def make_catalogue(n_rows, n_products=None, seed=0, min_words=20, max_words=80, n_rare=20_000):
+    """
+    Génère un DataFrame synthétique avec les colonnes ['product_name', 'description', 'product_category_tree'].
+
+    Les mots des descriptions suivent une loi de Zipf sur le vocabulaire (les mots de WORDS
+    en tête, puis une longue traîne de mots rares), comme dans un vrai catalogue. Chaque
+    article a une catégorie fixe, au format de la colonne product_category_tree de Flipkart.
+
+    Pour 10M lignes, prévoir plusieurs Go de mémoire (ou réduire max_words).
+
+    Args:
+    - n_rows (int): nombre de lignes.
+    - n_products (int): nombre d'articles distincts, default = n_rows // 2.
+    - seed (int): graine du générateur aléatoire, default = 0.
+    - min_words (int): nombre minimal de mots par description, default = 20.
+    - max_words (int): nombre maximal de mots par description, default = 80.
+    - n_rare (int): nombre de mots rares du vocabulaire, default = 20_000.
+
+    Returns:
+    - pd.DataFrame: le catalogue synthétique.
+    """
+    rng = np.random.default_rng(seed)
+    n_products = n_products or max(1, n_rows // 2)
+    vocabulary = make_vocabulary(n_rare)
+
+    # Loi de Zipf tronquée sur le rang des mots
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    lengths = rng.integers(min_words, max_words + 1, size=n_rows)
+    word_ids = rng.choice(len(vocabulary), size=int(lengths.sum()), p=weights / weights.sum())
+    tokens = vocabulary[word_ids].tolist()
+    ends = np.cumsum(lengths).tolist()
+    descriptions = [' '.join(tokens[start:end]).capitalize() + '.' for start, end in zip([0] + ends[:-1], ends)]
+
+    # Noms et catégories des articles, puis une ligne -> un article tiré au hasard
+    name_ids = rng.choice(len(WORDS), size=(n_products, 4))
+    top_levels = list(CATEGORIES)
+    product_names, product_trees = [], []
+    for i in range(n_products):
+        name = ' '.join(WORDS[j] for j in name_ids[i]).title() + f' {i}'
+        top_level = top_levels[i % len(top_levels)]
+        sub_level = CATEGORIES[top_level][(i // len(top_levels)) % len(CATEGORIES[top_level])]
+        product_names.append(name)
+        product_trees.append(f'["{top_level} >> {sub_level} >> {name}"]')
+    rows = rng.integers(0, n_products, size=n_rows)
+
+    return pd.DataFrame({'product_name': np.array(product_names, dtype=object)[rows],
+                         'description': descriptions,
+                         'product_category_tree': np.array(product_trees, dtype=object)[rows]})
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def iterrows_baseline(df, lemmatize=False, stopwords=(), min_length=0):
+    """
+    Reproduit l'ancienne boucle df.iterrows() -> RegexpTokenizer (suivie de la même lemmatisation et
+    des mêmes filtres), qui sert de référence.
+    """
+    tokenizer = nltk.RegexpTokenizer(r'\w+')
+    lemmatizer = nltk.WordNetLemmatizer() if lemmatize else None
+    corpora = {}
+    for _, row in df.iterrows():
+        words = tokenizer.tokenize(row['description'].lower())
+        if lemmatizer is not None:
+            words = [lemmatizer.lemmatize(w) for w in words]
+        if stopwords or min_length:
+            words = [w for w in words if w not in stopwords and len(w) >= min_length]
+        corpora.setdefault(row['product_name'], []).extend(words)
+    return corpora
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def check_tokenizer_equivalence():
+    """
+    Vérifie que les modes ligne et colonne donnent les tokens de nltk.RegexpTokenizer.
+
+    Les textes de contrôle couvrent les cas où les moteurs `re` et `regex` divergent :
+    marques combinantes d'un texte décomposé (NFD) et 'İ' (I majuscule pointé), dont la
+    minuscule est suivie d'un point combinant.
+    """
+    texts = [unicodedata.normalize('NFD', 'Café crème brûlée à İstanbul'),
+             unicodedata.normalize('NFC', 'Café crème brûlée à İstanbul'),
+             'İİ DİYARBAKIR', 'n°1 ÉTÉ déjà-vu', '', 'Ǆemal ﬁne']
+    tokenizer = nltk.RegexpTokenizer(r'\w+')
+    expected = [tokenizer.tokenize(text.lower()) for text in texts]
+
+    assert ptt.tokenize_column(texts) == expected
+    pipeline = ptt.TextPipeline(column='description').compile()
+    assert [pipeline.process(text) for text in texts] == expected
+
+    df = pd.DataFrame({'product_name': [f'p{i}' for i in range(len(texts))], 'description': texts})
+    assert dict(pipeline._build_corpora_by_column(df)) == iterrows_baseline(df)
+    assert dict(pipeline._build_corpora_by_row(df)) == iterrows_baseline(df)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def check_long_texts(n_rows=2_000):
+    """
+    Vérifie que la tokenisation en bloc ne dépend pas de la limite de temps de nltk.redos.
+
+    Les descriptions longues (150 à 300 mots, comme dans un vrai catalogue) font un buffer
+    joint de plusieurs Mo par bloc ; la limite est abaissée pour que le test reste rapide.
+    """
+    df = make_catalogue(n_rows, min_words=150, max_words=300)
+    expected = iterrows_baseline(df)
+    redos = ptt._redos
+    default_timeout = getattr(redos, 'DEFAULT_TIMEOUT', None)
+    if redos is not None:
+        redos.DEFAULT_TIMEOUT = 1e-4
+    try:
+        assert sum(map(len, ptt.tokenize_column(df['description']))) == sum(map(len, expected.values()))
+        pipeline = ptt.TextPipeline(column='description').compile()
+        assert dict(pipeline._build_corpora_by_column(df)) == expected
+    finally:
+        if redos is not None:
+            redos.DEFAULT_TIMEOUT = default_timeout
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def check_incremental_removal():
+    """
+    Vérifie qu'IncrementalCorpus.apply accepte un nom d'article seul dans `removed`.
+    """
+    df = pd.DataFrame({'product_name': ['Some product', 'S', 'o'],
+                       'description': ['red cotton shirt', 'blue shirt', 'green hat']})
+    corpus = ptt.IncrementalCorpus(ptt.TextPipeline(column='description'))
+    corpus.apply(added=df)
+    assert corpus.apply(removed='Some product') == {'Some product'}
+    assert set(corpus.freq) == {'S', 'o'}
+    assert corpus.apply(removed='Unknown product') == set()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def timeit(func, *args, repeat=3):
+    """
+    Retourne le meilleur temps d'exécution (en secondes) sur `repeat` essais.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def bench_tokenization(n_rows, repeat=3):
+    """
+    Compare la tokenisation ligne par ligne (iterrows) et les deux modes du TextPipeline.
+
+    Trois configurations sont mesurées, chacune par rapport à sa propre boucle iterrows :
+    tokenisation seule, tokenisation suivie d'un filtrage (stopwords et longueur minimale),
+    et lemmatisation suivie du filtrage (si WordNet est installé), où le mode colonne ne
+    lemmatise et ne filtre qu'une fois par mot distinct. TextPipeline.run choisit le mode
+    colonne par défaut seulement dans ce dernier cas, le seul où il est plus rapide.
+
+    Args:
+    - n_rows (int): nombre de lignes du catalogue synthétique.
+    - repeat (int): nombre d'essais par variante, default = 3.
+
+    Returns:
+    - pd.DataFrame: temps, lignes par seconde et accélération de chaque variante.
+    """
+    check_tokenizer_equivalence()
+    check_long_texts()
+
+    df = make_catalogue(n_rows)
+    configs = {
+        'tokenize': {},
+        'filter': {'stopwords': {'men', 'women', 'rs', 'x', 'cm'}, 'min_length': 3},
+    }
+    if ptt.RESOURCES.is_available('wordnet'):
+        configs['lemmatize'] = {'lemmatize': True, 'stopwords': {'men', 'women', 'rs', 'x', 'cm'}, 'min_length': 3}
+
+    rows = []
+    for name, options in configs.items():
+        pipeline = ptt.TextPipeline(column='description', **options).compile()
+
+        # Les deux modes doivent donner exactement les mêmes tokens que la boucle de référence
+        assert pipeline._build_corpora_by_column(df) == pipeline._build_corpora_by_row(df)
+        assert dict(pipeline._build_corpora_by_column(df)) == iterrows_baseline(df, **options)
+
+        # Chaque configuration est comparée à sa propre référence (même filtrage)
+        baseline = timeit(lambda: iterrows_baseline(df, **options), repeat=repeat)
+        timings = {
+            'iterrows': baseline,
+            'rows': timeit(pipeline._build_corpora_by_row, df, repeat=repeat),
+            'column': timeit(pipeline._build_corpora_by_column, df, repeat=repeat),
+        }
+        for variant, seconds in timings.items():
+            rows.append({'config': name, 'variant': variant, 'seconds': seconds, 'speedup': baseline / seconds})
+
+    results = pd.DataFrame(rows).set_index(['config', 'variant'])
+    results.insert(1, 'rows_per_sec', n_rows / results['seconds'])
+    return results
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Cas de la suite : nom -> (préparation, ressources NLTK requises, préparation à chaque essai)
+CASES = {}
+
+def case(name, requires=(), fresh=False):
+    """
+    Enregistre un cas de la suite.
+
+    La fonction décorée reçoit (df, workdir), fait la préparation non chronométrée et retourne
+    la fonction sans argument à chronométrer. Avec fresh=True, la préparation est refaite avant
+    chaque essai (cas qui modifient leur état, ou caches à froid).
+    """
+    def register(setup):
+        CASES[name] = (setup, tuple(requires), fresh)
+        return setup
+    return register
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+@case('tokenize_column')
+def _(df, workdir):
+    return lambda: ptt.tokenize_column(df['description'])
+
+@case('freq_stats_for_description')
+def _(df, workdir):
+    return lambda: ptt.freq_stats_for_description(df)
+
+@case('freq_stats_for_product_name')
+def _(df, workdir):
+    return lambda: ptt.freq_stats_for_product_name(df)
+
+@case('freq_stats_for_description_without_stopwords')
+def _(df, workdir):
+    return lambda: ptt.freq_stats_for_description_without_stopwords(df, STOPWORDS)
+
+@case('freq_stats_for_description_without_stopwords_and_with_lemmatizer', requires=('wordnet',))
+def _(df, workdir):
+    return lambda: ptt.freq_stats_for_description_without_stopwords_and_with_lemmatizer(df, STOPWORDS)
+
+@case('process_text', requires=('wordnet', 'words'))
+def _(df, workdir):
+    return lambda: ptt.process_text(df, STOPWORDS, 'description')
+
+@case('process_final_text', requires=('wordnet', 'words'))
+def _(df, workdir):
+    return lambda: ptt.process_final_text(df, STOPWORDS, 'description')
+
+@case('process_final_text (n_jobs)', requires=('wordnet', 'words'))
+def _(df, workdir):
+    return lambda: ptt.process_final_text(df, STOPWORDS, 'description', n_jobs=N_JOBS)
+
+@case('TextPipeline.run (n_jobs)')
+def _(df, workdir):
+    pipeline = ptt.TextPipeline(column='description')
+    return lambda: pipeline.run(df, n_jobs=N_JOBS)
+
+@case('build_allow_set (cold)', fresh=True)
+def _(df, workdir):
+    # Dictionnaire = vocabulaire du catalogue, comme le dictionnaire NLTK pour les vraies données
+    valid_words = frozenset(ptt.TextPipeline().run_matrix(df).vocabulary.words)
+    ptt._ALLOW_SETS.clear()
+    return lambda: ptt.build_allow_set(STOPWORDS, valid_words, 3)
+
+@case('build_allow_set (warm)')
+def _(df, workdir):
+    valid_words = frozenset(ptt.TextPipeline().run_matrix(df).vocabulary.words)
+    ptt.build_allow_set(STOPWORDS, valid_words, 3)
+    return lambda: ptt.build_allow_set(STOPWORDS, valid_words, 3)
+
+@case('TextPipeline.run_chunks')
+def _(df, workdir):
+    pipeline = ptt.TextPipeline(stopwords=STOPWORDS)
+    chunks = [df.iloc[start:start + 100_000] for start in range(0, len(df), 100_000)]
+    return lambda: pipeline.run_chunks(chunks)
+
+@case('TextPipeline.run_matrix')
+def _(df, workdir):
+    return lambda: ptt.TextPipeline(stopwords=STOPWORDS).run_matrix(df)
+
+@case('TextPipeline.run_ngrams')
+def _(df, workdir):
+    return lambda: ptt.TextPipeline(stopwords=STOPWORDS).run_ngrams(df, max_n=2)
+
+@case('NgramCounts.collocations')
+def _(df, workdir):
+    ngrams = ptt.TextPipeline(stopwords=STOPWORDS).run_ngrams(df, max_n=2)
+    return lambda: ngrams.collocations()
+
+@case('TextPipeline.count_approximate')
+def _(df, workdir):
+    return lambda: ptt.TextPipeline(stopwords=STOPWORDS).count_approximate(df)
+
+@case('TextVectorizer.fit_transform')
+def _(df, workdir):
+    return lambda: ptt.TextVectorizer(ptt.TextPipeline(stopwords=STOPWORDS)).fit_transform(df)
+
+@case('TextVectorizer.transform')
+def _(df, workdir):
+    vectorizer = ptt.TextVectorizer(ptt.TextPipeline(stopwords=STOPWORDS)).fit(df)
+    return lambda: vectorizer.transform(df)
+
+@case('freq_stats_from_csv')
+def _(df, workdir):
+    path = os.path.join(workdir, 'catalogue.csv')
+    if not os.path.exists(path):
+        df.to_csv(path, index=False)
+    return lambda: ptt.freq_stats_from_csv(path)
+
+@case('IncrementalCorpus.apply', fresh=True)
+def _(df, workdir):
+    check_incremental_removal()
+
+    # 90 % du catalogue déjà traité, les 10 % restants arrivent en mise à jour
+    split = int(len(df) * 0.9)
+    corpus = ptt.IncrementalCorpus(ptt.TextPipeline(stopwords=STOPWORDS), keep_corpora=False)
+    corpus.apply(added=df.iloc[:split])
+    return lambda: corpus.apply(added=df.iloc[split:])
+
+@case('corpus_fingerprint')
+def _(df, workdir):
+    pipeline = ptt.TextPipeline(stopwords=STOPWORDS)
+    return lambda: ptt.corpus_fingerprint(df, pipeline)
+
+@case('CorpusCache.run (cold)', fresh=True)
+def _(df, workdir):
+    directory = tempfile.mkdtemp(dir=workdir)
+    return lambda: ptt.CorpusCache(directory).run(df, ptt.TextPipeline(stopwords=STOPWORDS))
+
+@case('CorpusCache.run (warm)')
+def _(df, workdir):
+    cache = ptt.CorpusCache(tempfile.mkdtemp(dir=workdir))
+    cache.run(df, ptt.TextPipeline(stopwords=STOPWORDS))
+    return lambda: cache.run(df, ptt.TextPipeline(stopwords=STOPWORDS))
+
+@case('get_most_common_words')
+def _(df, workdir):
+    freq, _, _ = ptt.freq_stats_for_description(df)
+    return lambda: ptt.get_most_common_words(freq)
+
+@case('get_words_with_count')
+def _(df, workdir):
+    freq, _, _ = ptt.freq_stats_for_description(df)
+    return lambda: ptt.get_words_with_count(freq, 1)
+
+@case('get_numeric_words')
+def _(df, workdir):
+    freq, _, _ = ptt.freq_stats_for_description(df)
+    return lambda: ptt.get_numeric_words(freq)
+
+@case('create_set_personal_stopwords', requires=('stopwords',))
+def _(df, workdir):
+    freq, _, _ = ptt.freq_stats_for_description(df)
+    most_common_words = ptt.get_most_common_words(freq)
+    return lambda: ptt.create_set_personal_stopwords(most_common_words, True, True)
+
+@case('personal_stopwords')
+def _(df, workdir):
+    matrix = ptt.TextPipeline().run_matrix(df)
+    return lambda: ptt.personal_stopwords(matrix, unique=True, numerical=True, max_df=0.5, include_nltk=False)
+
+@case('print_wordcloud')
+def _(df, workdir):
+    words = Counter(dict(ptt.get_most_common_words(ptt.TextPipeline().run_matrix(df), 200)))
+    return lambda: ptt.print_wordcloud(words)
+
+@case('clean_category_first_level')
+def _(df, workdir):
+    return lambda: df['product_category_tree'].apply(ptt.clean_category_first_level)
+
+@case('clean_category_level')
+def _(df, workdir):
+    return lambda: df['product_category_tree'].apply(ptt.clean_category_level, level=1)
+
+@case('clean_category_column')
+def _(df, workdir):
+    return lambda: ptt.clean_category_column(df['product_category_tree'])
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _rss_mb(field):
+    """
+    Lit VmRSS (mémoire résidente) ou VmHWM (pic) dans /proc/self/status, en Mo. None hors Linux.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _max_rss_mb():
+    """
+    Pic de mémoire résidente du processus depuis son démarrage, en Mo (getrusage). None sans le module resource.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def _reset_peak_rss():
+    """
+    Remet le pic de mémoire résidente au niveau actuel (Linux >= 4.0), pour le mesurer sur un seul appel.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def measure_case(name, df, repeat=3, trace_allocations=True, workdir=None):
+    """
+    Mesure un cas de la suite dans le processus courant.
+
+    Args:
+    - name (str): nom du cas (clé de CASES).
+    - df (pd.DataFrame): catalogue synthétique.
+    - repeat (int): nombre d'essais chronométrés, default = 3.
+    - trace_allocations (bool): mesurer aussi le pic d'allocations Python avec tracemalloc
+      (essai supplémentaire, non chronométré), default = True.
+    - workdir (str): dossier des fichiers temporaires, default = None (dossier créé puis supprimé).
+
+    Returns:
+    - dict: temps (meilleur et moyen), lignes par seconde, pic de mémoire résidente et d'allocations.
+    """
+    setup, requires, fresh = CASES[name]
+    missing = [resource_name for resource_name in requires if not ptt.RESOURCES.is_available(resource_name)]
+    if missing:
+        return {'status': 'skipped', 'error': f"ressources NLTK absentes : {', '.join(missing)}"}
+
+    own_workdir = workdir is None
+    workdir = tempfile.mkdtemp() if own_workdir else workdir
+    try:
+        func = setup(df, workdir)
+        rss_before = _rss_mb('VmRSS')
+        can_reset = _reset_peak_rss()
+        if not can_reset:
+            peak_before = _max_rss_mb()
+
+        times = []
+        for i in range(repeat):
+            if fresh and i:
+                func = setup(df, workdir)
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        # Sans remise à zéro, le pic n'est connu que s'il dépasse celui d'avant les essais
+        peak_rss = _rss_mb('VmHWM') if can_reset else _max_rss_mb()
+        if not can_reset and (peak_rss is None or peak_rss <= peak_before):
+            peak_rss = None
+
+        allocation_peak = None
+        if trace_allocations:
+            func = setup(df, workdir) if fresh else func
+            tracemalloc.start()
+            try:
+                func()
+                allocation_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {'status': 'ok',
+            'seconds': min(times),
+            'mean_seconds': sum(times) / len(times),
+            'rows_per_sec': len(df) / min(times) if min(times) else None,
+            'peak_rss_mb': peak_rss,
+            'rss_increase_mb': peak_rss - rss_before if peak_rss is not None and rss_before is not None else None,
+            'allocation_peak_mb': allocation_peak}
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _measure_in_child(connection, name, df, repeat, trace_allocations, workdir):
+    try:
+        connection.send(measure_case(name, df, repeat, trace_allocations, workdir))
+    except Exception as error:
+        connection.send({'status': 'error', 'error': f'{type(error).__name__}: {error}'})
+    finally:
+        connection.close()
+
+def _measure_isolated(name, df, repeat, trace_allocations, workdir):
+    """
+    Mesure un cas dans un processus fils (fork) : le catalogue est partagé sans copie et le pic de
+    mémoire d'un cas n'influence pas les suivants. Sans fork (Windows), mesure dans le processus courant.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        try:
+            return measure_case(name, df, repeat, trace_allocations, workdir)
+        except Exception as error:
+            return {'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(sender, name, df, repeat, trace_allocations, workdir))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {'status': 'error', 'error': f'processus terminé (code {process.exitcode})'}
+    process.join()
+    if result['status'] == 'ok' and process.exitcode:
+        result = {'status': 'error', 'error': f'processus terminé (code {process.exitcode})'}
+    return result
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def environment(label=None):
+    """
+    Retourne la description de l'environnement enregistrée avec chaque résultat.
+
+    Args:
+    - label (str): nom de la version mesurée, default = None (commit git courant).
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'label': label or commit,
+            'commit': commit,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.platform(),
+            'cpus': os.cpu_count()}
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def run_suite(sizes=SIZES, functions=None, repeat=3, trace_allocations=True, label=None, output=None,
+              seed=0, verbose=True):
+    """
+    Mesure chaque fonction publique de pre_treatment_text pour chaque taille de catalogue.
+
+    Chaque cas est mesuré dans un processus séparé. Les résultats sont ajoutés au fichier
+    `output` au fil de l'eau (une ligne JSON par cas et par taille), pour que les mesures déjà
+    faites soient conservées si une grande taille est interrompue.
+
+    Args:
+    - sizes (tuple): nombres de lignes des catalogues, default = SIZES (1k, 100k ; LARGE_SIZES pour 10M).
+    - functions (list): cas à mesurer, default = None (tous les cas de CASES).
+    - repeat (int): nombre d'essais chronométrés, default = 3.
+    - trace_allocations (bool): mesurer le pic d'allocations Python, default = True.
+    - label (str): nom de la version mesurée, default = None (commit git courant).
+    - output (str): fichier JSON lines complété par les résultats, default = None (pas de sauvegarde).
+    - seed (int): graine du générateur de catalogues, default = 0.
+    - verbose (bool): afficher chaque résultat, default = True.
+
+    Returns:
+    - pd.DataFrame: une ligne par cas et par taille.
+    """
+    functions = list(functions or CASES)
+    unknown = set(functions) - set(CASES)
+    if unknown:
+        raise ValueError(f"cas inconnus : {sorted(unknown)}")
+
+    env = environment(label)
+    records = []
+    for n_rows in sizes:
+        df = make_catalogue(n_rows, seed=seed)
+        workdir = tempfile.mkdtemp()
+        try:
+            for name in functions:
+                record = {**env, 'function': name, 'n_rows': n_rows,
+                          **_measure_isolated(name, df, repeat, trace_allocations, workdir)}
+                records.append(record)
+                if output is not None:
+                    with open(output, 'a', encoding='utf-8') as file:
+                        file.write(json.dumps(record) + '\n')
+                if verbose:
+                    if record['status'] == 'ok':
+                        print(f"{n_rows:>10} {name:<70} {record['seconds']:10.4f} s "
+                              f"{record['rows_per_sec']:14,.0f} lignes/s")
+                    else:
+                        print(f"{n_rows:>10} {name:<70} {record['status']} ({record.get('error')})")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        del df
+
+    return pd.DataFrame(records)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def load_results(path):
+    """
+    Charge les résultats enregistrés par run_suite.
+    """
+    return pd.read_json(path, lines=True)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def compare_results(results, baseline, candidate, metric='seconds'):
+    """
+    Compare deux versions mesurées : ratio candidate / baseline pour chaque cas et chaque taille.
+
+    Si une version a été mesurée plusieurs fois, sa dernière mesure est retenue.
+
+    Args:
+    - results (pd.DataFrame or str): résultats, ou chemin du fichier JSON lines.
+    - baseline (str): label de la version de référence.
+    - candidate (str): label de la version comparée.
+    - metric (str): mesure comparée, default = 'seconds' (un ratio > 1 est une régression).
+
+    Returns:
+    - pd.DataFrame: valeurs des deux versions et ratio, par (function, n_rows).
+    """
+    if isinstance(results, str):
+        results = load_results(results)
+    results = results[results['status'] == 'ok'].sort_values('timestamp')
+    latest = results.groupby(['label', 'function', 'n_rows'])[metric].last()
+
+    comparison = pd.DataFrame({baseline: latest.loc[baseline], candidate: latest.loc[candidate]}).dropna()
+    comparison['ratio'] = comparison[candidate] / comparison[baseline]
+    return comparison.sort_values('ratio', ascending=False)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--suite', action='store_true', help="mesurer toutes les fonctions publiques")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--large', action='store_true', help="ajouter les grandes tailles (LARGE_SIZES, 10M lignes)")
+    parser.add_argument('--functions', nargs='+', default=None, choices=list(CASES), metavar='FUNCTION')
+    parser.add_argument('--no-allocations', action='store_true', help="ne pas mesurer les allocations (tracemalloc)")
+    parser.add_argument('--label', default=None, help="nom de la version mesurée (commit git par défaut)")
+    parser.add_argument('--output', default='bench_results.jsonl')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="comparer deux versions déjà mesurées dans --output")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_results(args.output, *args.compare).round(3))
+    elif args.suite:
+        sizes = args.sizes + [size for size in LARGE_SIZES if args.large and size not in args.sizes]
+        run_suite(sizes=sizes, functions=args.functions, repeat=args.repeat,
+                  trace_allocations=not args.no_allocations, label=args.label, output=args.output)
+    else:
+        print(bench_tokenization(args.rows, repeat=args.repeat).round(3))
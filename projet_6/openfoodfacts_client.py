@@ -0,0 +1,447 @@
+"""
+    Client asynchrone pour l'API de recherche Open Food Facts
+
+    Toutes les pages de résultats sont récupérées en parallèle (pool de connexions aiohttp),
+    avec limitation du débit, nouvelles tentatives avec backoff exponentiel et un cache
+    disque des réponses. Les produits sont écrits au fil de l'eau dans un fichier CSV ou
+    Parquet : seule une page de JSON est en mémoire à la fois.
+
+    Exemple :
+        import openfoodfacts_client as off
+
+        n = off.export_products("result_api.csv", ingredient="champagne", limit=10,
+                                cache=off.ResponseCache("cache_off"))
+
+    L'URL de l'API est un paramètre (base_url), ce qui permet de tester le client contre
+    un serveur local.
+"""
+
+import asyncio
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import random
+import tempfile
+
+import aiohttp
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
+
+# Colonnes du fichier exporté -> (champ Open Food Facts, valeur par défaut)
+PRODUCT_FIELDS = {
+    "foodId": ("code", "N/A"),
+    "label": ("product_name", "Nom inconnu"),
+    "category": ("categories", "Non précisé"),
+    "foodContentsLabel": ("ingredients_text", "Non précisé"),
+    "image": ("image_url", "Aucune image"),
+}
+
+# Codes HTTP pour lesquels une nouvelle tentative a un sens
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def search_params(ingredient=None, page_size=100, **params):
+    """
+    Construit les paramètres de la recherche Open Food Facts.
+
+    Args:
+    - ingredient (str): ingrédient recherché (ex: "champagne"), default = None.
+    - page_size (int): nombre de produits par page, default = 100.
+    - params: autres paramètres de l'API.
+
+    Returns:
+    - dict: les paramètres de la requête, sans le numéro de page.
+    """
+    query = {"action": "process", "json": "true", "page_size": page_size}
+    if ingredient is not None:
+        query.update({"tagtype_0": "ingredients", "tag_contains_0": "contains", "tag_0": ingredient})
+    query.update(params)
+    return query
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def contains_ingredient(product, ingredient):
+    """
+    Indique si le texte des ingrédients d'un produit contient `ingredient`.
+    """
+    return ingredient.lower() in (product.get("ingredients_text") or "").lower()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def extract_product(product, fields=PRODUCT_FIELDS):
+    """
+    Extrait les colonnes à exporter d'un produit Open Food Facts.
+
+    Args:
+    - product (dict): le produit retourné par l'API.
+    - fields (dict): colonne -> (champ de l'API, valeur par défaut), default = PRODUCT_FIELDS.
+
+    Returns:
+    - dict: une ligne du fichier exporté.
+    """
+    return {column: product.get(field, default) for column, (field, default) in fields.items()}
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class ResponseCache:
+    """
+    Cache disque des réponses HTTP, indexé par l'URL et les paramètres de la requête.
+
+    Chaque réponse est stockée telle quelle dans un fichier dont le nom est le hash de la
+    requête ; l'écriture passe par un fichier temporaire pour ne jamais laisser une entrée
+    incomplète.
+
+    Args:
+    - directory (str): répertoire du cache, créé si besoin.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url, params):
+        payload = json.dumps([url, sorted((str(k), str(v)) for k, v in params.items())])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, url, params):
+        """
+        Retourne le corps de la réponse en cache, ou None.
+        """
+        try:
+            with open(self._path(self.key(url, params)), "rb") as file:
+                body = file.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def put(self, url, params, body):
+        """
+        Enregistre le corps d'une réponse.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(body)
+        os.replace(tmp_path, self._path(self.key(url, params)))
+
+    def clear(self):
+        """
+        Vide le cache.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class RateLimiter:
+    """
+    Limiteur de débit (seau à jetons) partagé par toutes les requêtes d'un client.
+
+    Args:
+    - rate (float): nombre de requêtes par seconde.
+    - burst (int): nombre de requêtes pouvant partir d'un coup, default = 1.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class OpenFoodFactsClient:
+    """
+    Client asynchrone et paginé de l'API de recherche Open Food Facts.
+
+    S'utilise comme gestionnaire de contexte asynchrone :
+
+        async with OpenFoodFactsClient(cache=ResponseCache("cache_off")) as client:
+            async for product in client.iter_products(search_params("champagne")):
+                ...
+
+    Args:
+    - base_url (str): URL de la recherche, default = SEARCH_URL.
+    - concurrency (int): nombre maximal de requêtes (et de connexions) simultanées, default = 4.
+    - rate (float): nombre maximal de requêtes par seconde, default = 2. None pour ne pas limiter.
+    - retries (int): nombre de nouvelles tentatives par page, default = 3.
+    - backoff (float): délai (s) avant la première nouvelle tentative, doublé à chaque échec, default = 0.5.
+    - timeout (float): délai maximal (s) d'une requête, default = 30.
+    - cache (ResponseCache): cache disque des réponses, default = None.
+    - user_agent (str): User-Agent envoyé, comme le demande Open Food Facts.
+    """
+
+    def __init__(self, base_url=SEARCH_URL, concurrency=4, rate=2, retries=3, backoff=0.5, timeout=30,
+                 cache=None, user_agent="Data_scientist_formation/projet_6"):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.user_agent = user_agent
+        self._limiter = RateLimiter(rate, burst=concurrency) if rate else None
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    def _retry_delay(self, attempt, response=None):
+        # Retry-After du serveur s'il est donné, sinon backoff exponentiel avec un peu d'aléa
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return float(response.headers["Retry-After"])
+        return self.backoff * 2 ** attempt * (1 + random.random() / 2)
+
+    async def _get(self, params):
+        if self.cache is not None:
+            body = self.cache.get(self.base_url, params)
+            if body is not None:
+                return body
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            if self._limiter is not None:
+                await self._limiter.acquire()
+            try:
+                async with self._session.get(self.base_url, params=params) as response:
+                    if response.status in RETRY_STATUSES and not last_attempt:
+                        delay = self._retry_delay(attempt, response)
+                    else:
+                        response.raise_for_status()
+                        body = await response.read()
+                        break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+                delay = self._retry_delay(attempt)
+            await asyncio.sleep(delay)
+
+        if self.cache is not None:
+            self.cache.put(self.base_url, params, body)
+        return body
+
+    async def fetch_page(self, params, page=1):
+        """
+        Récupère une page de résultats.
+
+        Args:
+        - params (dict): paramètres de la recherche (voir search_params).
+        - page (int): numéro de la page, à partir de 1, default = 1.
+
+        Returns:
+        - dict: la réponse JSON de l'API ('count', 'page', 'page_size', 'products').
+        """
+        return json.loads(await self._get({**params, "page": page}))
+
+    async def iter_pages(self, params, max_pages=None):
+        """
+        Parcourt toutes les pages d'une recherche.
+
+        La première page donne le nombre total de produits ; les suivantes sont ensuite
+        récupérées en parallèle, `concurrency` à la fois, et retournées dès qu'elles
+        arrivent (donc pas forcément dans l'ordre).
+
+        Args:
+        - params (dict): paramètres de la recherche (voir search_params).
+        - max_pages (int): nombre maximal de pages, default = None (toutes).
+
+        Yields:
+        - dict: la réponse JSON de chaque page.
+        """
+        first = await self.fetch_page(params, 1)
+        yield first
+
+        page_size = int(first.get("page_size") or params.get("page_size") or len(first.get("products", [])) or 1)
+        n_pages = -(-int(first.get("count", 0)) // page_size)
+        if max_pages is not None:
+            n_pages = min(n_pages, max_pages)
+
+        # Fenêtre glissante de requêtes en cours : la mémoire reste bornée quel que soit le nombre de pages
+        pages = iter(range(2, n_pages + 1))
+        pending = set()
+        try:
+            while True:
+                for page in pages:
+                    pending.add(asyncio.ensure_future(self.fetch_page(params, page)))
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_products(self, params, max_pages=None):
+        """
+        Parcourt tous les produits d'une recherche, page par page.
+
+        Yields:
+        - dict: chaque produit retourné par l'API.
+        """
+        async with contextlib.aclosing(self.iter_pages(params, max_pages=max_pages)) as pages:
+            async for data in pages:
+                for product in data.get("products", []):
+                    yield product
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class CsvProductWriter:
+    """
+    Écrit les produits dans un fichier CSV (séparateur ';'), ligne par ligne.
+    """
+
+    def __init__(self, path, columns, delimiter=";"):
+        self._file = open(path, mode="w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, delimiter=delimiter)
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class ParquetProductWriter:
+    """
+    Écrit les produits dans un fichier Parquet, par groupes de `batch_size` lignes.
+
+    Nécessite pyarrow.
+    """
+
+    def __init__(self, path, columns, batch_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("l'export Parquet nécessite pyarrow (pip install pyarrow)") from error
+
+        self._pa = pa
+        self._schema = pa.schema([(column, pa.string()) for column in columns])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._batch_size = batch_size
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append({column: None if value is None else str(value) for column, value in row.items()})
+        if len(self._rows) >= self._batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def product_writer(path, columns, format=None):
+    """
+    Retourne le writer adapté au format, déduit de l'extension du fichier par défaut.
+
+    Args:
+    - path (str): fichier de sortie.
+    - columns (list): colonnes du fichier.
+    - format (str): 'csv' ou 'parquet', default = None (d'après l'extension).
+    """
+    format = format or ("parquet" if path.endswith((".parquet", ".pq")) else "csv")
+    if format == "parquet":
+        return ParquetProductWriter(path, columns)
+    if format == "csv":
+        return CsvProductWriter(path, columns)
+    raise ValueError(f"format inconnu : {format}")
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+async def export_products_async(path, ingredient=None, params=None, limit=None, filter_ingredient=True,
+                                fields=PRODUCT_FIELDS, format=None, max_pages=None, **client_kwargs):
+    """
+    Version asynchrone de export_products, à utiliser depuis une boucle asyncio déjà lancée
+    (par exemple dans un notebook : `await export_products_async(...)`).
+    """
+    params = params if params is not None else search_params(ingredient)
+    writer = product_writer(path, list(fields), format)
+    n_written = 0
+    try:
+        async with OpenFoodFactsClient(**client_kwargs) as client:
+            # aclosing : les requêtes encore en cours sont annulées dès que `limit` est atteint
+            async with contextlib.aclosing(client.iter_products(params, max_pages=max_pages)) as products:
+                async for product in products:
+                    if filter_ingredient and ingredient is not None and not contains_ingredient(product, ingredient):
+                        continue
+                    writer.write(extract_product(product, fields))
+                    n_written += 1
+                    if limit is not None and n_written >= limit:
+                        break
+    finally:
+        writer.close()
+    return n_written
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def export_products(path, ingredient=None, params=None, limit=None, filter_ingredient=True,
+                    fields=PRODUCT_FIELDS, format=None, max_pages=None, **client_kwargs):
+    """
+    Récupère les produits d'une recherche Open Food Facts et les écrit au fil de l'eau dans un fichier.
+
+    Args:
+    - path (str): fichier de sortie (.csv ou .parquet).
+    - ingredient (str): ingrédient recherché (ex: "champagne"), default = None.
+    - params (dict): paramètres de recherche complets, à la place de `ingredient`, default = None.
+    - limit (int): nombre maximal de produits écrits, default = None (tous).
+    - filter_ingredient (bool): ne garder que les produits dont le texte des ingrédients contient
+      `ingredient`, default = True.
+    - fields (dict): colonne -> (champ de l'API, valeur par défaut), default = PRODUCT_FIELDS.
+    - format (str): 'csv' ou 'parquet', default = None (d'après l'extension).
+    - max_pages (int): nombre maximal de pages récupérées, default = None (toutes).
+    - client_kwargs: paramètres de OpenFoodFactsClient (base_url, concurrency, rate, retries, cache...).
+
+    Returns:
+    - int: le nombre de produits écrits.
+    """
+    return asyncio.run(export_products_async(path, ingredient=ingredient, params=params, limit=limit,
+                                             filter_ingredient=filter_ingredient, fields=fields,
+                                             format=format, max_pages=max_pages, **client_kwargs))
@@ -13,17 +13,2351 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import words
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('omw-1.4')
 
 import wordcloud
 from wordcloud import WordCloud
 
 from collections import defaultdict
 from collections import Counter
+from collections import OrderedDict
+from itertools import chain
 
+import hashlib
+import json
+import os
 import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import scipy.sparse
+import scipy.special
+
+try:
+    # Depuis nltk 3.10, RegexpTokenizer compile son motif avec le moteur `regex` (via nltk.redos)
+    from nltk import redos as _redos
+except ImportError:
+    _redos = None
+
+# Options du tokenizer, identiques à celles de nltk.RegexpTokenizer
+_TOKENIZER_FLAGS = re.UNICODE | re.MULTILINE | re.DOTALL
+
+# Séparateur de textes pour la tokenisation en bloc (caractère de contrôle, jamais un token \w)
+_TEXT_SEPARATOR = '\x1f'
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _compile_tokenizer(pattern):
+    """
+    Compile le motif du tokenizer avec le même moteur et les mêmes options que nltk.RegexpTokenizer.
+
+    Le moteur `regex` utilisé par nltk ne classe pas les caractères comme `re` (marques combinantes
+    d'un texte NFD, 'İ' mis en minuscules...) : compiler avec `re` donnerait d'autres tokens.
+    Le motif vient de la configuration du pipeline et non des données : la limite de temps de
+    nltk.redos est désactivée, sinon un findall sur un bloc de longs textes peut la dépasser.
+
+    Args:
+    - pattern (str): expression régulière du tokenizer.
+
+    Returns:
+    - le motif compilé (nltk.redos.TimedPattern, ou re.Pattern avec un nltk antérieur à 3.10).
+    """
+    if _redos is None:
+        return re.compile(pattern, _TOKENIZER_FLAGS)
+    return _redos.compile(pattern, _TOKENIZER_FLAGS, timeout=None)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _tokenize_joined(texts, pattern=r'\w+', block_size=50_000):
+    """
+    Tokenise tous les textes par blocs, avec une seule passe de regex par bloc sur un buffer joint.
+
+    Les textes d'un bloc sont joints par `_TEXT_SEPARATOR`, mis en minuscules d'un coup, puis
+    découpés par un unique findall dont l'alternative `_TEXT_SEPARATOR` marque la fin de chaque
+    texte. Le motif est compilé comme nltk.RegexpTokenizer, sans limite de temps par findall ;
+    les blocs bornent seulement la taille du buffer. Si le séparateur apparaît dans les
+    textes ou est absorbé par le motif, on revient à la tokenisation texte par texte.
+
+    Args:
+    - texts (pd.Series or list): les textes à tokeniser.
+    - pattern (str): expression régulière du tokenizer, default = r'\w+'.
+    - block_size (int): nombre de textes par findall, default = 50_000.
+
+    Returns:
+    - tokens (np.ndarray): tous les tokens, dans l'ordre des textes.
+    - lengths (np.ndarray): le nombre de tokens de chaque texte.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty(0, dtype=object), np.zeros(0, dtype=np.int64)
+
+    findall = _compile_tokenizer(f'{_TEXT_SEPARATOR}|(?:{pattern})').findall
+    token_blocks = []
+    length_blocks = []
+    for start in range(0, len(texts), block_size):
+        block = texts[start:start + block_size]
+        buffer = _TEXT_SEPARATOR.join(block).lower()
+        tokens = np.array(findall(buffer), dtype=object)
+        is_separator = tokens == _TEXT_SEPARATOR
+        separators = np.flatnonzero(is_separator)
+
+        if len(separators) != len(block) - 1 or buffer.count(_TEXT_SEPARATOR) != len(block) - 1:
+            findall = _compile_tokenizer(pattern).findall
+            token_lists = [findall(text.lower()) for text in texts]
+            lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+            return np.array(list(chain.from_iterable(token_lists)), dtype=object), lengths
+
+        # Nombre de tokens entre deux séparateurs successifs
+        bounds = np.concatenate(([-1], separators, [len(tokens)]))
+        token_blocks.append(tokens[~is_separator])
+        length_blocks.append(np.diff(bounds) - 1)
+
+    return np.concatenate(token_blocks), np.concatenate(length_blocks)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def tokenize_column(texts, pattern=r'\w+'):
+    """
+    Tokenise une colonne de textes en bloc, avec une seule passe de regex sur toute la colonne.
+
+    Donne les mêmes tokens que nltk.RegexpTokenizer(pattern).tokenize(text.lower())
+    appliqué à chaque texte, sans boucle Python sur les lignes du DataFrame.
+
+    Args:
+    - texts (pd.Series or list): les textes à tokeniser.
+    - pattern (str): expression régulière du tokenizer, default = r'\w+'.
+
+    Returns:
+    - list: la liste des tokens de chaque texte, dans l'ordre des textes.
+    """
+    tokens, lengths = _tokenize_joined(texts, pattern)
+    tokens = tokens.tolist()
+    ends = np.cumsum(lengths).tolist()
+    starts = [0] + ends[:-1]
+    return [tokens[start:end] for start, end in zip(starts, ends)]
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class NltkResources:
+    """
+    Gestionnaire paresseux des ressources NLTK (stopwords, WordNet, dictionnaire de mots).
+
+    Aucune ressource n'est téléchargée à l'import du module. Un corpus trouvé localement n'est
+    plus recherché ensuite (un corpus absent est recherché à nouveau à chaque appel, pour voir
+    un téléchargement fait entre-temps), le réseau n'est utilisé que si `allow_download` est
+    vrai ou via `prefetch()`, et les ensembles construits (stopwords, mots valides) sont
+    gardés en mémoire pour tout le processus.
+
+    Args:
+    - allow_download (bool): télécharger une ressource absente au lieu de lever une erreur, default = False.
+    - download_dir (str): dossier de téléchargement, default = None (dossier par défaut de NLTK).
+
+    Example:
+        # Lors de la construction de l'image
+        python -c "import pre_treatment_text as ptt; ptt.prefetch()"
+    """
+
+    # Chemin de chaque ressource dans nltk_data
+    PATHS = {'stopwords': 'corpora/stopwords',
+             'wordnet': 'corpora/wordnet',
+             'omw-1.4': 'corpora/omw-1.4',
+             'words': 'corpora/words'}
+
+    def __init__(self, allow_download=False, download_dir=None):
+        self.allow_download = allow_download
+        self.download_dir = download_dir
+        self._available = {}
+        self._stopwords = {}
+        self._valid_words = None
+
+    def is_available(self, name):
+        """
+        Indique si la ressource est présente localement (seule une ressource trouvée est gardée en cache).
+        """
+        if not self._available.get(name):
+            try:
+                nltk.data.find(self.PATHS.get(name, name))
+            except LookupError:
+                return False
+            self._available[name] = True
+        return True
+
+    def ensure(self, name):
+        """
+        Vérifie que la ressource est disponible, et la télécharge si `allow_download` est vrai.
+
+        Raises:
+            LookupError: si la ressource est absente et que le téléchargement n'est pas autorisé.
+        """
+        if self.is_available(name):
+            return
+        if self.allow_download and nltk.download(name, download_dir=self.download_dir, quiet=True):
+            self._available[name] = True
+            return
+        raise LookupError(f"Ressource NLTK '{name}' absente : lancer prefetch() avec accès réseau "
+                          f"ou copier nltk_data dans l'un des dossiers {nltk.data.path}")
+
+    def prefetch(self, names=None):
+        """
+        Télécharge explicitement les ressources, par exemple lors de la construction d'une image.
+
+        Args:
+        - names (list): ressources à télécharger, default = toutes celles de PATHS.
+
+        Returns:
+        - dict: pour chaque ressource, True si elle est disponible localement.
+        """
+        status = {}
+        for name in names or self.PATHS:
+            available = self.is_available(name)
+            if not available:
+                available = bool(nltk.download(name, download_dir=self.download_dir, quiet=True))
+                if available:
+                    self._available[name] = True
+            status[name] = available
+        return status
+
+    def stopwords(self, language='english'):
+        """
+        Retourne l'ensemble des stopwords NLTK de la langue, construit une seule fois.
+        """
+        if language not in self._stopwords:
+            self.ensure('stopwords')
+            self._stopwords[language] = frozenset(stopwords.words(language))
+        return self._stopwords[language]
+
+    def valid_words(self):
+        """
+        Retourne le dictionnaire des mots anglais de NLTK, construit une seule fois.
+        """
+        if self._valid_words is None:
+            self.ensure('words')
+            self._valid_words = frozenset(words.words())
+        return self._valid_words
+
+# Ressources NLTK partagées par tout le module
+RESOURCES = NltkResources()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def prefetch(names=None, download_dir=None):
+    """
+    Télécharge les ressources NLTK utilisées par le module (à appeler lors du build de l'image).
+
+    Args:
+    - names (list): ressources à télécharger, default = toutes.
+    - download_dir (str): dossier de téléchargement, default = None (dossier par défaut de NLTK).
+
+    Returns:
+    - dict: pour chaque ressource, True si elle est disponible localement.
+    """
+    if download_dir is not None:
+        RESOURCES.download_dir = download_dir
+    return RESOURCES.prefetch(names)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class LemmaCache:
+    """
+    Cache LRU borné des lemmes WordNet, partagé entre les appels et sauvegardable sur disque.
+
+    Le texte produit suit une loi de Zipf : la plupart des appels à `lemmatize` portent sur
+    les mêmes mots. Le cache évite de relancer WordNet pour ces mots et compte les succès
+    (hits) et les échecs (misses) pour mesurer le travail économisé.
+
+    Args:
+    - maxsize (int): nombre maximal de mots conservés, default = 200_000.
+    - lemmatizer (object): objet avec une méthode `lemmatize(word)`, default = WordNetLemmatizer créé au premier besoin.
+
+    Example:
+        LEMMA_CACHE.load('lemmas.json')
+        freq, stats_df, corpora = process_final_text(df, sw, 'description')
+        LEMMA_CACHE.save('lemmas.json')
+        print(LEMMA_CACHE.info())
+    """
+
+    def __init__(self, maxsize=200_000, lemmatizer=None):
+        self.maxsize = maxsize
+        self._lemmatizer = lemmatizer
+        self._lemmas = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lemmatize(self, word):
+        """
+        Retourne le lemme de `word`, calculé par WordNet uniquement s'il n'est pas en cache.
+        """
+        lemmas = self._lemmas
+        try:
+            lemma = lemmas[word]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            lemmas.move_to_end(word)
+            return lemma
+
+        self.misses += 1
+        if self._lemmatizer is None:
+            RESOURCES.ensure('wordnet')
+            self._lemmatizer = WordNetLemmatizer()
+        lemma = lemmas[word] = self._lemmatizer.lemmatize(word)
+        if len(lemmas) > self.maxsize:
+            # On retire le mot utilisé il y a le plus longtemps
+            lemmas.popitem(last=False)
+        return lemma
+
+    def info(self):
+        """
+        Retourne les compteurs du cache.
+
+        Returns:
+        - dict: 'hits', 'misses', 'hit_rate', 'size' et 'maxsize'.
+        """
+        calls = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / calls if calls else 0.0,
+                'size': len(self._lemmas),
+                'maxsize': self.maxsize}
+
+    def clear(self):
+        """
+        Vide le cache et remet les compteurs à zéro.
+        """
+        self._lemmas.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, path):
+        """
+        Sauvegarde les lemmes en cache dans un fichier JSON, du moins au plus récemment utilisé.
+
+        Args:
+        - path (str): chemin du fichier.
+        """
+        with open(path, mode='w', encoding='utf-8') as file:
+            json.dump(list(self._lemmas.items()), file, ensure_ascii=False)
+
+    def load(self, path):
+        """
+        Charge des lemmes sauvegardés par `save`, sans modifier les compteurs.
+
+        Args:
+        - path (str): chemin du fichier.
+
+        Returns:
+        - LemmaCache: le cache lui-même.
+        """
+        with open(path, mode='r', encoding='utf-8') as file:
+            for word, lemma in json.load(file):
+                self._lemmas[word] = lemma
+                self._lemmas.move_to_end(word)
+        while len(self._lemmas) > self.maxsize:
+            self._lemmas.popitem(last=False)
+        return self
+
+# Cache des lemmes partagé par tous les pipelines du module
+LEMMA_CACHE = LemmaCache()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Ensembles de mots autorisés déjà construits, par configuration (stopwords, dictionnaire, longueur minimale)
+_ALLOW_SETS = OrderedDict()
+_ALLOW_SETS_MAXSIZE = 8
+
+def build_allow_set(stopwords, valid_words, min_length=0):
+    """
+    Précalcule l'ensemble des mots autorisés : mots du dictionnaire, hors stopwords, d'au moins min_length lettres.
+
+    Le filtre `w not in sw and w in valid_words and len(w) >= min_length` devient un seul test
+    `w in allow_set`. L'ensemble est mis en cache par configuration et réutilisé par tous les
+    pipelines qui partagent les mêmes stopwords, le même dictionnaire et la même longueur.
+
+    Args:
+    - stopwords (set): mots à exclure.
+    - valid_words (set): dictionnaire des mots autorisés.
+    - min_length (int): longueur minimale des mots, default = 0.
+
+    Returns:
+    - frozenset: les mots autorisés.
+    """
+    # Le hash d'un frozenset est calculé une seule fois puis gardé par Python
+    key = (frozenset(stopwords), frozenset(valid_words), min_length)
+    allow_set = _ALLOW_SETS.get(key)
+    if allow_set is None:
+        sw = key[0]
+        allow_set = frozenset(w for w in key[1] if len(w) >= min_length and w not in sw)
+        _ALLOW_SETS[key] = allow_set
+        if len(_ALLOW_SETS) > _ALLOW_SETS_MAXSIZE:
+            _ALLOW_SETS.popitem(last=False)
+    else:
+        _ALLOW_SETS.move_to_end(key)
+    return allow_set
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class PipelineProfiler:
+    """
+    Instrumentation optionnelle du pipeline : temps, tokens en entrée et en sortie, cache et mémoire par étape.
+
+    Chaque étape (tokenize, lemmatize, filter, group, freq, stats...) est mesurée une fois par
+    appel sur toute la colonne, et non par token : l'instrumentation ne coûte que quelques
+    microsecondes par appel. Sans profiler (cas par défaut), les étapes passent par un objet
+    vide et le pipeline n'est pas ralenti.
+
+    En mode ligne par ligne (vectorized=False, le mode par défaut sans lemmatisation), les étapes
+    sont fusionnées et seule l'étape 'process_rows' est mesurée : passer vectorized=True pour
+    le détail par étape. En mode parallèle, seule l'étape 'parallel' du processus principal
+    est mesurée.
+
+    Args:
+    - callback (callable): fonction appelée à la fin de chaque étape avec un dictionnaire
+      ('stage', 'parent', 'start', 'seconds', 'tokens_in', 'tokens_out', 'cache_hits',
+      'cache_misses', 'peak_memory_mb'), default = None.
+    - trace_memory (bool): mesurer le pic d'allocations Python de chaque étape avec tracemalloc
+      (ralentit nettement le traitement ; tracemalloc est arrêté à la fin de l'étape de plus haut
+      niveau s'il ne tournait pas avant), default = False.
+
+    Example:
+        profiler = PipelineProfiler()
+        freq, stats_df, corpora = process_final_text(df, sw, 'description', profiler=profiler)
+        print(profiler.to_frame())
+
+        # Export vers OpenTelemetry
+        def to_span(event):
+            start = int(event['start'] * 1e9)
+            span = tracer.start_span(event['stage'], start_time=start)
+            span.set_attributes({k: v for k, v in event.items() if isinstance(v, (int, float))})
+            span.end(end_time=start + int(event['seconds'] * 1e9))
+        profiler = PipelineProfiler(callback=to_span)
+    """
+
+    COUNTERS = ('tokens_in', 'tokens_out', 'cache_hits', 'cache_misses')
+
+    def __init__(self, callback=None, trace_memory=False):
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.stages = OrderedDict()
+        self._stack = []
+        self._top_level = set()
+
+    def stage(self, name):
+        """
+        Retourne le gestionnaire de contexte qui mesure l'étape `name`.
+        """
+        return _StageSpan(self, name)
+
+    def _record(self, span):
+        metrics = self.stages.get(span.name)
+        if metrics is None:
+            metrics = self.stages[span.name] = dict(dict.fromkeys(('calls', 'seconds') + self.COUNTERS, 0),
+                                                     peak_memory_mb=None)
+        metrics['calls'] += 1
+        metrics['seconds'] += span.seconds
+        for counter, value in span.counts.items():
+            metrics[counter] += value
+        if span.peak_memory_mb is not None:
+            metrics['peak_memory_mb'] = max(metrics['peak_memory_mb'] or 0.0, span.peak_memory_mb)
+
+        if self.callback is not None:
+            self.callback({'stage': span.name,
+                           'parent': span.parent.name if span.parent is not None else None,
+                           'start': span.start,
+                           'seconds': span.seconds,
+                           **dict.fromkeys(self.COUNTERS, None), **span.counts,
+                           'peak_memory_mb': span.peak_memory_mb})
+
+    def to_frame(self):
+        """
+        Retourne les mesures cumulées par étape.
+
+        Returns:
+        - pd.DataFrame: une ligne par étape, dans l'ordre de première exécution, avec 'calls',
+          'seconds', les compteurs, 'hit_rate' du cache et 'peak_memory_mb'.
+        """
+        frame = pd.DataFrame.from_dict(self.stages, orient='index',
+                                       columns=['calls', 'seconds', *self.COUNTERS, 'peak_memory_mb'])
+        lookups = frame['cache_hits'] + frame['cache_misses']
+        frame['hit_rate'] = (frame['cache_hits'] / lookups).where(lookups > 0)
+        return frame
+
+    def summary(self):
+        """
+        Retourne les totaux : temps de toutes les étapes de premier niveau et pic de mémoire résidente du processus.
+        """
+        return {'seconds': sum(metrics['seconds'] for name, metrics in self.stages.items()
+                               if name in self._top_level),
+                'stages': len(self.stages),
+                'peak_rss_mb': _peak_rss_mb()}
+
+    def reset(self):
+        """
+        Remet les mesures à zéro.
+        """
+        self.stages.clear()
+        self._top_level.clear()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class _StageSpan:
+    """
+    Mesure d'une exécution d'étape, créée par PipelineProfiler.stage.
+    """
+
+    __slots__ = ('profiler', 'name', 'parent', 'counts', 'start', 'seconds', 'peak_memory_mb',
+                 '_started', '_memory_start', '_child_peak', '_owns_tracing')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.counts = {}
+        self.peak_memory_mb = None
+        self._owns_tracing = False
+
+    def record(self, **counts):
+        """
+        Ajoute des compteurs à l'étape (tokens_in, tokens_out, cache_hits, cache_misses).
+        """
+        for counter, value in counts.items():
+            self.counts[counter] = self.counts.get(counter, 0) + int(value)
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        self.parent = stack[-1] if stack else None
+        if self.parent is None:
+            self.profiler._top_level.add(self.name)
+        stack.append(self)
+
+        if self.profiler.trace_memory:
+            # tracemalloc n'est démarré (puis arrêté en sortie) que s'il ne tournait pas déjà
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # Le pic déjà atteint par l'étape parente est conservé avant la remise à zéro
+            if self.parent is not None and self.parent._memory_start is not None:
+                self.parent._child_peak = max(self.parent._child_peak, peak)
+            tracemalloc.reset_peak()
+            self._memory_start = current
+            self._child_peak = 0
+        else:
+            self._memory_start = None
+
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._started
+        self.profiler._stack.pop()
+
+        if self._memory_start is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self._child_peak)
+            self.peak_memory_mb = (peak - self._memory_start) / 2 ** 20
+            if self.parent is not None and self.parent._memory_start is not None:
+                self.parent._child_peak = max(self.parent._child_peak, peak)
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+        self.profiler._record(self)
+        return False
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class _NullSpan:
+    """
+    Étape sans instrumentation : ne mesure rien (profiler désactivé).
+    """
+
+    __slots__ = ()
+
+    def record(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _stage(profiler, name):
+    """
+    Retourne la mesure de l'étape `name`, ou l'étape vide si le profiler est désactivé.
+    """
+    return _NULL_SPAN if profiler is None else _StageSpan(profiler, name)
+
+def _peak_rss_mb():
+    """
+    Pic de mémoire résidente du processus en Mo (None si le module resource n'existe pas, sous Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss est en Ko sous Linux et en octets sous macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2 ** 20 if sys.platform == 'darwin' else maxrss / 1024
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class TextPipeline:
+    """
+    Pipeline de pré traitement de texte configuré une seule fois puis compilé.
+
+    La configuration (tokenizer, lemmatisation, stopwords, dictionnaire, longueur minimale)
+    est transformée par `compile()` en une unique fonction qui enchaîne tokenisation,
+    lemmatisation et filtrage en une seule passe sur les tokens, sans liste intermédiaire
+    par étape.
+
+    Args:
+    - column (str): colonne à tokeniser, default = 'description'.
+    - group_by (str): colonne qui identifie l'article, default = 'product_name'.
+    - pattern (str): expression régulière du tokenizer, default = r'\w+' (comme nltk.RegexpTokenizer).
+    - lemmatize (bool): lemmatiser les tokens avec WordNet, default = False.
+    - lemma_cache (LemmaCache): cache des lemmes, default = LEMMA_CACHE partagé par le module.
+    - stopwords (set): mots à exclure (après lemmatisation), default = None.
+    - valid_words (set): dictionnaire des mots autorisés, default = None (pas de filtre).
+    - min_length (int): longueur minimale des mots conservés, default = 0.
+    - profiler (PipelineProfiler): mesure de chaque étape, default = None (pas d'instrumentation).
+
+    Example:
+        pipeline = TextPipeline(column='description', lemmatize=True, stopwords=sw)
+        freq, stats_df, corpora = pipeline.run(df)
+    """
+
+    def __init__(self,
+                 column='description',
+                 group_by='product_name',
+                 pattern=r'\w+',
+                 lemmatize=False,
+                 lemma_cache=None,
+                 stopwords=None,
+                 valid_words=None,
+                 min_length=0,
+                 profiler=None):
+        self.column = column
+        self.group_by = group_by
+        self.pattern = pattern
+        self.lemmatize = lemmatize
+        self.lemma_cache = lemma_cache
+        self.stopwords = stopwords
+        self.valid_words = valid_words
+        self.min_length = min_length
+        self.profiler = profiler
+        self._process = None
+
+    def compile(self):
+        """
+        Construit la fonction fusionnée texte -> tokens correspondant à la configuration.
+
+        Returns:
+        - TextPipeline: le pipeline lui-même, pour pouvoir chaîner les appels.
+        """
+        # Même moteur et mêmes options que nltk.RegexpTokenizer
+        findall = _compile_tokenizer(self.pattern).findall
+        lemma = (self.lemma_cache or LEMMA_CACHE).lemmatize if self.lemmatize else None
+
+        # Un seul prédicat qui regroupe tous les filtres demandés
+        sw = frozenset(self.stopwords) if self.stopwords else frozenset()
+        min_length = self.min_length
+        if self.valid_words is not None:
+            # Dictionnaire fermé : stopwords, dictionnaire et longueur fusionnés en un seul test d'appartenance
+            with _stage(self.profiler, 'allow_set') as span:
+                allow_set = build_allow_set(sw, self.valid_words, min_length)
+                span.record(tokens_in=len(self.valid_words), tokens_out=len(allow_set))
+            keep = allow_set.__contains__
+        elif min_length:
+            keep = lambda w: w not in sw and len(w) >= min_length
+        elif sw:
+            keep = lambda w: w not in sw
+        else:
+            keep = None
+
+        # Choix de la boucle la plus courte possible pour cette configuration
+        if lemma is None and keep is None:
+            process = lambda text: findall(text.lower())
+        elif lemma is None:
+            process = lambda text: [w for w in findall(text.lower()) if keep(w)]
+        elif keep is None:
+            process = lambda text: list(map(lemma, findall(text.lower())))
+        else:
+            process = lambda text: [w for w in map(lemma, findall(text.lower())) if keep(w)]
+
+        self._process = process
+        # Étapes conservées séparément pour le mode colonne, qui les applique par mot distinct
+        self._lemma = lemma
+        self._keep = keep
+        return self
+
+    def process(self, text):
+        """
+        Applique le pipeline compilé à un texte.
+
+        Args:
+        - text (str): le texte à traiter.
+
+        Returns:
+        - list: la liste des tokens conservés.
+        """
+        if self._process is None:
+            self.compile()
+        return self._process(text)
+
+    def __getstate__(self):
+        # Les fonctions compilées ne sont pas picklables : chaque processus recompile le pipeline.
+        # Le profiler reste dans le processus principal.
+        state = self.__dict__.copy()
+        state.update(_process=None, _lemma=None, _keep=None, profiler=None)
+        return state
+
+    def run(self, df, vectorized=None, n_jobs=1, return_freq=True, return_corpora=True, extended_stats=False):
+        """
+        Construit le corpus par article puis calcule les fréquences et les statistiques.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes `group_by` et `column`.
+        - vectorized (bool): traite la colonne en bloc plutôt que ligne par ligne, default = None
+          (en bloc seulement quand il est plus rapide : avec lemmatisation, appliquée une fois par mot
+          distinct, ou pour les statistiques seules). Les deux modes donnent exactement le même résultat.
+        - n_jobs (int): nombre de processus, -1 pour tous les coeurs, default = 1.
+        - return_freq (bool): construire freq, default = True.
+        - return_corpora (bool): retourner corpora, default = True.
+        - extended_stats (bool): ajouter les colonnes 'ttr' (mots distincts / total) et 'hapax'
+          (mots présents une seule fois) aux statistiques, default = False.
+
+        Returns:
+        - freq (dict): Fréquences des mots pour chaque article, None si return_freq est faux.
+        - stats_df (pd.DataFrame): DataFrame des statistiques par article.
+        - corpora (defaultdict): Liste des mots retenus pour chaque article, None si return_corpora est faux.
+        """
+        if self._process is None:
+            self.compile()
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        if vectorized is None:
+            # Sans lemmatisation, la boucle sur les lignes (zip) est plus rapide que le traitement en bloc
+            vectorized = bool(self.lemmatize) or (not return_freq and not return_corpora)
+
+        # Statistiques seules : comptage direct dans la matrice creuse, sans liste ni FreqDist par article
+        if not return_freq and not return_corpora and vectorized and n_jobs <= 1:
+            return None, self.run_matrix(df).to_stats(extended=extended_stats), None
+
+        profiler = self.profiler
+        word_counts = None
+        tokens = None
+        if n_jobs > 1 and len(df) > 1:
+            # Les fréquences sont comptées dans les processus, les listes de mots ne reviennent
+            # que si elles sont demandées (ou nécessaires aux statistiques sans fréquences)
+            with _stage(profiler, 'parallel') as span:
+                corpora, freq = self._build_corpora_in_parallel(df, vectorized, n_jobs, count=return_freq,
+                                                                keep_corpora=return_corpora or not return_freq)
+                span.record(tokens_in=len(df))
+            if return_freq:
+                with _stage(profiler, 'stats'):
+                    stats_df = _stats_from_freq(freq, extended_stats)
+                return freq, stats_df, corpora
+        elif vectorized:
+            # Les comptages globaux sont calculés sur les tokens déjà regroupés, dans la même passe
+            products, tokens, counts = self._tokens_by_product(df)
+            with _stage(profiler, 'corpora'):
+                corpora = _group_tokens(products, tokens, counts)
+            if return_freq:
+                with _stage(profiler, 'word_counts') as span:
+                    word_counts = WordCounts.from_tokens(tokens)
+                    span.record(tokens_in=len(tokens), tokens_out=len(word_counts.words))
+        else:
+            with _stage(profiler, 'process_rows') as span:
+                corpora = self._build_corpora_by_row(df)
+                if profiler is not None:
+                    span.record(tokens_in=len(df), tokens_out=sum(map(len, corpora.values())))
+
+        if not return_freq:
+            # Statistiques comptées en bloc sur les tokens, sans construire de FreqDist par article
+            with _stage(profiler, 'stats'):
+                if tokens is None:
+                    stats_df = _stats_from_corpora(corpora, extended_stats)
+                else:
+                    stats_df = _stats_from_tokens(products, tokens, counts, extended_stats)
+            return None, stats_df, (corpora if return_corpora else None)
+
+        freq, stats_df = _freq_and_stats(corpora, extended_stats=extended_stats, profiler=profiler)
+        if word_counts is not None:
+            freq.word_counts = word_counts
+
+        return freq, stats_df, (corpora if return_corpora else None)
+
+    def _build_corpora_in_parallel(self, df, vectorized, n_jobs, count=False, keep_corpora=True):
+        """
+        Construit le corpus par article en répartissant des blocs de lignes sur un pool de processus.
+
+        Le pipeline (avec ses stopwords et son dictionnaire) est envoyé une seule fois à chaque
+        processus par l'initializer, les tâches ne transportent que leurs lignes. Chaque processus
+        compte les fréquences de son bloc, et le processus principal ne fait que fusionner ces
+        comptages partiels. Les blocs sont contigus et fusionnés dans l'ordre, ce qui conserve
+        l'ordre des articles et des tokens du traitement séquentiel.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes `group_by` et `column`.
+        - vectorized (bool): traite chaque bloc en colonne plutôt que ligne par ligne.
+        - n_jobs (int): nombre de processus.
+        - count (bool): compter les fréquences par article dans les processus, default = False.
+        - keep_corpora (bool): renvoyer aussi les listes de mots de chaque article, default = True.
+
+        Returns:
+        - corpora (defaultdict): Liste des mots pour chaque article, None si keep_corpora est faux.
+        - freq (CorpusFreq): Fréquences des mots pour chaque article, None si count est faux.
+        """
+        columns = list(dict.fromkeys([self.group_by, self.column]))
+        bounds = np.linspace(0, len(df), min(len(df), n_jobs * 4) + 1, dtype=np.int64)
+        shards = (df[columns].iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:]))
+        n_shards = len(bounds) - 1
+
+        corpora = defaultdict(list) if keep_corpora else None
+        freq = CorpusFreq() if count else None
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as executor:
+            for shard_corpora, shard_freq in executor.map(_build_shard, shards, [vectorized] * n_shards,
+                                                          [count] * n_shards, [keep_corpora] * n_shards):
+                if keep_corpora:
+                    for product, words in shard_corpora.items():
+                        corpora[product] += words
+                if count:
+                    for product, product_freq in shard_freq.items():
+                        if product in freq:
+                            freq[product].update(product_freq)
+                        else:
+                            freq[product] = product_freq
+
+        return corpora, freq
+
+    def run_chunks(self, chunks, keep_corpora=False, extended_stats=False, backend='exact'):
+        """
+        Construit les fréquences et les statistiques de manière incrémentale, bloc par bloc.
+
+        Seuls les compteurs de mots par article sont conservés entre deux blocs : la mémoire
+        dépend de la taille du vocabulaire et non de celle du corpus. Les listes de tokens ne
+        sont gardées que si `keep_corpora` est vrai.
+
+        Avec backend='approximate', seuls des comptages globaux approximés à mémoire fixe sont
+        tenus (Count-Min sketch + mots fréquents, voir ApproximateWordCounts), pour les corpus
+        dont même le vocabulaire par article ne tient pas en mémoire.
+
+        Args:
+        - chunks (pd.DataFrame or iterable): un DataFrame, ou des blocs de lignes (pd.read_csv(..., chunksize=...)).
+        - keep_corpora (bool): conserver aussi la liste des mots de chaque article, default = False.
+        - extended_stats (bool): ajouter les colonnes 'ttr' et 'hapax' aux statistiques, default = False.
+        - backend (str or ApproximateWordCounts): 'exact', 'approximate', ou des comptages approximés
+          déjà dimensionnés (ApproximateWordCounts(epsilon, delta, capacity)) à compléter, default = 'exact'.
+
+        Returns:
+        - freq (dict): Fréquences des mots pour chaque article (ApproximateWordCounts en mode approximé).
+        - stats_df (pd.DataFrame): DataFrame des statistiques par article, None en mode approximé.
+        - corpora (defaultdict): Liste des mots retenus pour chaque article, None si keep_corpora est faux
+          ou en mode approximé.
+        """
+        if self._process is None:
+            self.compile()
+        # Un DataFrame seul est un unique bloc (l'itérer donnerait ses noms de colonnes)
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+
+        if backend == 'approximate':
+            backend = ApproximateWordCounts()
+        if isinstance(backend, ApproximateWordCounts):
+            for chunk in chunks:
+                _, tokens, _ = self._tokens_by_product(chunk)
+                backend.update(tokens)
+            return backend, None, None
+        if backend != 'exact':
+            raise ValueError(f"backend inconnu : {backend}")
+
+        freq = CorpusFreq()
+        corpora = defaultdict(list) if keep_corpora else None
+
+        for chunk in chunks:
+            chunk_corpora = self._build_corpora_by_column(chunk)
+            with _stage(self.profiler, 'freq'):
+                for product, words in chunk_corpora.items():
+                    if product not in freq:
+                        freq[product] = nltk.FreqDist()
+                    freq[product].update(words)
+                    if keep_corpora:
+                        corpora[product] += words
+
+        with _stage(self.profiler, 'stats'):
+            stats_df = _stats_from_freq(freq, extended_stats)
+        return freq, stats_df, corpora
+
+    def count_approximate(self, chunks, epsilon=1e-4, delta=1e-3, capacity=10_000):
+        """
+        Compte les mots du corpus de manière approximée, à mémoire fixe (Count-Min sketch + mots fréquents).
+
+        Aucun comptage par article ni vocabulaire exact n'est conservé : à utiliser quand les
+        dictionnaires exacts ne tiennent plus en mémoire.
+
+        Args:
+        - chunks (pd.DataFrame or iterable): un DataFrame, ou des blocs de lignes (pd.read_csv(..., chunksize=...)).
+        - epsilon (float): erreur maximale relative au nombre total de tokens, default = 1e-4.
+        - delta (float): probabilité de dépasser cette erreur, default = 1e-3.
+        - capacity (int): nombre de mots fréquents suivis, default = 10_000.
+
+        Returns:
+        - ApproximateWordCounts: les comptages approximés, utilisables avec get_most_common_words.
+        """
+        counts = ApproximateWordCounts(epsilon=epsilon, delta=delta, capacity=capacity)
+        return self.run_chunks(chunks, backend=counts)[0]
+
+    def _build_corpora_by_row(self, df):
+        """
+        Construit le corpus par article en appliquant le pipeline compilé à chaque ligne.
+        """
+        process = self._process
+
+        corpora = defaultdict(list)
+
+        # Construction du corpus par image, en une seule passe sur les lignes
+        for product, text in zip(df[self.group_by], df[self.column]):
+            corpora[product] += process(text)
+
+        return corpora
+
+    def _build_corpora_by_column(self, df):
+        """
+        Construit le corpus par article en traitant la colonne en bloc.
+
+        La colonne est tokenisée d'un coup, la lemmatisation et les filtres sont appliqués
+        une seule fois par mot distinct, puis les tokens sont regroupés par article avec
+        des tableaux numpy, sans créer d'objet pandas par ligne.
+        """
+        products, tokens, counts = self._tokens_by_product(df)
+        with _stage(self.profiler, 'corpora'):
+            return _group_tokens(products, tokens, counts)
+
+    def _tokens_by_product(self, df, return_rows=False):
+        """
+        Tokenise, lemmatise et filtre la colonne en bloc, puis regroupe les tokens par article.
+
+        Returns:
+        - products (list): les articles, dans l'ordre d'apparition (comme le defaultdict).
+        - tokens (np.ndarray): les mots retenus, regroupés par article dans l'ordre des lignes.
+        - counts (np.ndarray): le nombre de mots retenus pour chaque article.
+        - rows (np.ndarray): la ligne d'origine de chaque token, si return_rows est vrai.
+        """
+        profiler = self.profiler
+
+        # Code entier de chaque article, dans l'ordre d'apparition
+        with _stage(profiler, 'factorize_products') as span:
+            product_codes, products = pd.factorize(df[self.group_by], sort=False, use_na_sentinel=False)
+            products = products.tolist()
+            span.record(tokens_in=len(product_codes), tokens_out=len(products))
+
+        # Tokenisation de toute la colonne
+        with _stage(profiler, 'tokenize') as span:
+            tokens, lengths = _tokenize_joined(df[self.column], self.pattern)
+            token_products = np.repeat(product_codes, lengths)
+            token_rows = np.repeat(np.arange(len(lengths)), lengths) if return_rows else None
+            span.record(tokens_in=len(lengths), tokens_out=len(tokens))
+
+        # Lemmatisation et filtrage une seule fois par mot distinct
+        if self._lemma is not None or self._keep is not None:
+            with _stage(profiler, 'factorize_tokens') as span:
+                token_codes, types = pd.factorize(tokens)
+                types = list(types)
+                span.record(tokens_in=len(tokens), tokens_out=len(types))
+            if self._lemma is not None:
+                with _stage(profiler, 'lemmatize') as span:
+                    cache = self._lemma.__self__
+                    hits, misses = cache.hits, cache.misses
+                    types = [self._lemma(w) for w in types]
+                    span.record(tokens_in=len(types), tokens_out=len(set(types)) if profiler is not None else 0,
+                                cache_hits=cache.hits - hits, cache_misses=cache.misses - misses)
+            if self._keep is not None:
+                with _stage(profiler, 'filter') as span:
+                    allowed = np.fromiter(map(self._keep, types), dtype=bool, count=len(types))
+                    mask = allowed[token_codes]
+                    token_codes = token_codes[mask]
+                    token_products = token_products[mask]
+                    if return_rows:
+                        token_rows = token_rows[mask]
+                    span.record(tokens_in=len(mask), tokens_out=len(token_codes))
+            tokens = np.array(types, dtype=object)[token_codes]
+
+        # Regroupement par article, le tri stable conserve l'ordre des tokens
+        with _stage(profiler, 'group') as span:
+            if np.any(np.diff(token_products) < 0):
+                order = np.argsort(token_products, kind='stable')
+                tokens = tokens[order]
+                if return_rows:
+                    token_rows = token_rows[order]
+            counts = np.bincount(token_products, minlength=len(products))
+            span.record(tokens_in=len(tokens), tokens_out=len(tokens))
+
+        if return_rows:
+            return products, tokens, counts, token_rows
+        return products, tokens, counts
+
+    def run_matrix(self, df, vocabulary=None, max_ngram=1):
+        """
+        Construit directement la représentation compacte du corpus (vocabulaire + matrice creuse).
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes `group_by` et `column`.
+        - vocabulary (Vocabulary): vocabulaire à compléter, default = un nouveau vocabulaire.
+        - max_ngram (int): compter aussi les n-grammes jusqu'à cette taille dans la même passe,
+          disponibles dans l'attribut `ngrams` du résultat, default = 1 (mots seuls).
+
+        Returns:
+        - CorpusMatrix: les comptages articles x vocabulaire.
+        """
+        if self._process is None:
+            self.compile()
+
+        products, tokens, counts, rows = self._tokens_by_product(df, return_rows=True)
+        with _stage(self.profiler, 'vocabulary') as span:
+            vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+            word_ids = vocabulary.add_all(tokens)
+            span.record(tokens_in=len(tokens), tokens_out=len(vocabulary))
+        with _stage(self.profiler, 'matrix'):
+            token_products = np.repeat(np.arange(len(products)), counts)
+            matrix = CorpusMatrix(products, vocabulary,
+                                  _count_matrix(token_products, word_ids, len(products), len(vocabulary)))
+        if max_ngram > 1:
+            with _stage(self.profiler, 'ngrams'):
+                matrix.ngrams = NgramCounts.from_ids(vocabulary, word_ids, rows, max_ngram)
+        return matrix
+
+    def run_ngrams(self, df, max_n=2, vocabulary=None):
+        """
+        Compte les mots et les n-grammes (jusqu'à max_n) du corpus en une seule passe.
+
+        Les n-grammes sont formés sur la suite de mots retenus par le pipeline (après
+        lemmatisation et filtrage), sans jamais franchir la limite entre deux lignes.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes `group_by` et `column`.
+        - max_n (int): taille maximale des n-grammes, default = 2.
+        - vocabulary (Vocabulary): vocabulaire à compléter, default = un nouveau vocabulaire.
+
+        Returns:
+        - NgramCounts: les comptages des n-grammes, encodés par identifiants de mots.
+        """
+        return self.run_matrix(df, vocabulary=vocabulary, max_ngram=max(2, max_n)).ngrams
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _group_tokens(products, tokens, counts):
+    """
+    Découpe les tokens regroupés par article en un corpus (defaultdict article -> liste de mots).
+    """
+    grouped_words = tokens.tolist()
+    ends = np.cumsum(counts).tolist()
+    starts = [0] + ends[:-1]
+
+    return defaultdict(list, zip(products, (grouped_words[start:end] for start, end in zip(starts, ends))))
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class WordCounts:
+    """
+    Comptages globaux des mots du corpus : un tableau de mots et le tableau de leurs comptages.
+
+    Les requêtes (top-k, mots présents n fois, mots numériques) travaillent sur les tableaux
+    numpy : un top-k utilise une sélection partielle (np.partition) et ne trie que les k mots
+    retenus, les requêtes filtrées ne trient rien.
+
+    Args:
+    - words (list): les mots, dans l'ordre de première apparition.
+    - counts (np.ndarray): le nombre d'occurrences de chaque mot.
+    """
+
+    def __init__(self, words, counts):
+        self.words = np.asarray(words, dtype=object)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """
+        Compte une séquence de tokens en une seule factorisation.
+        """
+        codes, words = pd.factorize(np.asarray(tokens, dtype=object))
+        return cls(words, np.bincount(codes, minlength=len(words)))
+
+    @classmethod
+    def from_freq(cls, freq):
+        """
+        Fusionne les fréquences par article (dict de FreqDist) en comptages globaux.
+        """
+        total_freq = Counter()
+        for product_freq in freq.values():
+            total_freq.update(product_freq)
+        return cls(list(total_freq.keys()), np.fromiter(total_freq.values(), dtype=np.int64, count=len(total_freq)))
+
+    def __len__(self):
+        return len(self.words)
+
+    def most_common(self, n=None):
+        """
+        Retourne les n mots les plus fréquents, dans le même ordre que Counter.most_common(n).
+
+        Args:
+        - n (int): nombre de mots à retourner, default = None (tous).
+
+        Returns:
+        - list: liste de tuples (mot, fréquence), triée par fréquence décroissante.
+        """
+        present = np.flatnonzero(self.counts > 0)
+        if n is not None and n < len(present):
+            if n <= 0:
+                return []
+            # Seuil = n-ième plus grand comptage, trouvé par sélection partielle
+            present_counts = self.counts[present]
+            threshold = np.partition(present_counts, len(present) - n)[len(present) - n]
+            above = present[present_counts > threshold]
+            # À égalité sur le seuil, les premiers mots apparus sont gardés, comme dans un Counter
+            ties = present[present_counts == threshold][:n - len(above)]
+            present = np.concatenate((above, ties))
+
+        # Tri par fréquence décroissante puis ordre d'apparition, sur les seuls mots retenus
+        order = present[np.lexsort((present, -self.counts[present]))]
+        return list(zip(self.words[order].tolist(), self.counts[order].tolist()))
+
+    def with_count(self, count=1):
+        """
+        Retourne les mots présents exactement `count` fois (les hapax pour count = 1), sans tri.
+        """
+        return self.words[self.counts == count].tolist()
+
+    def numeric(self):
+        """
+        Retourne les mots composés uniquement de chiffres, sans tri.
+        """
+        is_digit = np.fromiter(map(str.isdigit, self.words), dtype=bool, count=len(self.words))
+        return self.words[is_digit & (self.counts > 0)].tolist()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class CorpusFreq(dict):
+    """
+    Dictionnaire des fréquences par article (article -> FreqDist), qui garde aussi les
+    comptages globaux du corpus (`word_counts`).
+
+    Quand le pipeline les a calculés pendant la construction du corpus, ils sont réutilisés
+    directement ; sinon ils sont calculés une seule fois à la première demande. Toute
+    modification du dictionnaire (ajout, remplacement ou suppression d'un article) les
+    invalide ; un FreqDist modifié en place doit être réaffecté (freq[article] = fd).
+    """
+
+    _global_counts = None
+
+    @property
+    def word_counts(self):
+        if self._global_counts is None:
+            self._global_counts = WordCounts.from_freq(self)
+        return self._global_counts
+
+    @word_counts.setter
+    def word_counts(self, value):
+        self._global_counts = value
+
+    def __setitem__(self, key, value):
+        self._global_counts = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._global_counts = None
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._global_counts = None
+        return super().__ior__(other)
+
+    def update(self, *args, **kwargs):
+        self._global_counts = None
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self._global_counts = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._global_counts = None
+        return super().popitem()
+
+    def clear(self):
+        self._global_counts = None
+        super().clear()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._global_counts = None
+        return super().setdefault(key, default)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class CountMinSketch:
+    """
+    Count-Min sketch : comptage approximé des mots dans une table de taille fixe.
+
+    L'estimation d'un mot n'est jamais inférieure à son vrai comptage, et la dépasse d'au
+    plus epsilon * N (N = nombre total de tokens comptés) avec une probabilité 1 - delta.
+
+    Args:
+    - width (int): nombre de colonnes de la table.
+    - depth (int): nombre de lignes (fonctions de hachage) de la table.
+    """
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon=1e-4, delta=1e-3):
+        """
+        Dimensionne la table pour une erreur epsilon * N avec une probabilité d'échec delta.
+        """
+        return cls(width=int(np.ceil(np.e / epsilon)), depth=int(np.ceil(np.log(1 / delta))))
+
+    def _columns(self, words):
+        # Double hachage : h_i = h1 + i * h2, à partir d'un seul hash 64 bits par mot
+        hashes = pd.util.hash_array(np.asarray(words, dtype=object))
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.width)).astype(np.int64) for i in range(self.depth)]
+
+    def update(self, words, counts):
+        """
+        Ajoute des comptages à des mots distincts.
+
+        Args:
+        - words (np.ndarray): mots distincts.
+        - counts (np.ndarray): comptage à ajouter pour chaque mot.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in zip(self.table, self._columns(words)):
+            np.add.at(row, columns, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, words):
+        """
+        Retourne l'estimation (par excès) du comptage de chaque mot.
+        """
+        if len(words) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.min([row[columns] for row, columns in zip(self.table, self._columns(words))], axis=0)
+
+    def __getitem__(self, word):
+        return int(self.estimate([word])[0])
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class ApproximateWordCounts:
+    """
+    Comptages globaux approximés à mémoire fixe : un Count-Min sketch pour tous les mots et
+    un ensemble borné de mots fréquents (heavy hitters) suivis explicitement.
+
+    Après chaque bloc, les candidats (anciens mots suivis + mots du bloc) sont classés par
+    leur estimation et seuls les `capacity` premiers sont gardés. La mémoire reste fixe quelle
+    que soit la taille du vocabulaire.
+
+    S'utilise comme WordCounts : get_most_common_words, get_words_with_count, get_numeric_words
+    et personal_stopwords travaillent sur les mots suivis. Les mots rares (hapax...) sont les
+    premiers à sortir de l'ensemble suivi : dès qu'un mot en est sorti, with_count et la règle
+    `unique` lèvent une ValueError pour les comptages qui ne sont plus tous suivis (voir
+    `min_complete_count`), au lieu de retourner une sélection incomplète. Pour tester n'importe
+    quel mot (par exemple les hapax d'un vocabulaire donné), utiliser `estimate(words)` : une
+    estimation égale à 1 garantit que le mot n'est apparu qu'une fois.
+
+    Args:
+    - epsilon (float): erreur maximale relative au nombre total de tokens, default = 1e-4.
+    - delta (float): probabilité de dépasser cette erreur, default = 1e-3.
+    - capacity (int): nombre de mots fréquents suivis, default = 10_000.
+    """
+
+    def __init__(self, epsilon=1e-4, delta=1e-3, capacity=10_000):
+        self.sketch = CountMinSketch.from_error(epsilon, delta)
+        self.capacity = capacity
+        self._candidates = np.empty(0, dtype=object)
+        # Plus grande estimation d'un mot sorti de l'ensemble suivi
+        self._evicted_max = 0
+
+    def update(self, tokens):
+        """
+        Compte un bloc de tokens (avec répétitions).
+        """
+        codes, uniques = pd.factorize(np.asarray(tokens, dtype=object))
+        if not len(uniques):
+            return self
+        self.sketch.update(uniques, np.bincount(codes, minlength=len(uniques)))
+
+        # Les candidats sont reclassés avec le sketch à jour, seuls les `capacity` premiers restent suivis
+        candidates = pd.unique(np.concatenate((self._candidates, np.asarray(uniques, dtype=object))))
+        if len(candidates) > self.capacity:
+            estimates = self.sketch.estimate(candidates)
+            order = np.argpartition(-estimates, self.capacity - 1)
+            self._evicted_max = max(self._evicted_max, int(estimates[order[self.capacity:]].max()))
+            candidates = candidates[np.sort(order[:self.capacity])]
+        self._candidates = np.asarray(candidates, dtype=object)
+        return self
+
+    def estimate(self, words):
+        """
+        Retourne l'estimation (par excès) du comptage de chaque mot.
+        """
+        return self.sketch.estimate(words)
+
+    @property
+    def words(self):
+        return self._candidates
+
+    @property
+    def counts(self):
+        return self.sketch.estimate(self._candidates)
+
+    @property
+    def min_complete_count(self):
+        """
+        Plus petit comptage pour lequel tous les mots qui l'atteignent sont suivis (1 si aucun mot n'est sorti).
+        """
+        return self._evicted_max + 1
+
+    def _check_complete(self, count):
+        if count < self.min_complete_count:
+            raise ValueError(f"les mots vus moins de {self.min_complete_count} fois ne sont plus tous suivis "
+                             f"(capacity = {self.capacity}) : la sélection des mots de comptage {count} serait "
+                             f"incomplète. Augmenter capacity, tester un vocabulaire avec estimate(words) "
+                             f"ou utiliser le comptage exact (backend='exact').")
+
+    def _word_counts(self):
+        return WordCounts(self.words, self.counts)
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def most_common(self, n=None):
+        """
+        Retourne les n mots suivis les plus fréquents avec leur comptage estimé.
+        """
+        return self._word_counts().most_common(n)
+
+    def with_count(self, count=1):
+        """
+        Retourne les mots suivis dont le comptage estimé vaut `count`.
+
+        Lève une ValueError si des mots de ce comptage ont pu sortir de l'ensemble suivi.
+        """
+        self._check_complete(count)
+        return self._word_counts().with_count(count)
+
+    def numeric(self):
+        """
+        Retourne les mots suivis composés uniquement de chiffres.
+        """
+        return self._word_counts().numeric()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class Vocabulary:
+    """
+    Vocabulaire global qui associe à chaque mot un identifiant entier, dans l'ordre d'apparition.
+
+    Args:
+    - words (iterable): mots à ajouter dès la création, default = None.
+    """
+
+    def __init__(self, words=None):
+        self.word_to_id = {}
+        self.words = []
+        if words is not None:
+            self.add_all(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.word_to_id
+
+    def add(self, word):
+        """
+        Ajoute un mot s'il est nouveau et retourne son identifiant.
+        """
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = self.word_to_id[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def add_all(self, words):
+        """
+        Ajoute une séquence de mots et retourne leurs identifiants.
+
+        Args:
+        - words (iterable): les mots, avec répétitions.
+
+        Returns:
+        - np.ndarray: l'identifiant de chaque mot de la séquence.
+        """
+        # Factorisation en bloc, puis un seul accès au dictionnaire par mot distinct
+        codes, uniques = pd.factorize(np.asarray(words, dtype=object))
+        ids = np.fromiter(map(self.add, uniques), dtype=np.int64, count=len(uniques))
+        return ids[codes]
+
+    def encode(self, words):
+        """
+        Retourne les identifiants des mots connus du vocabulaire, -1 pour les mots inconnus.
+        """
+        codes, uniques = pd.factorize(np.asarray(words, dtype=object))
+        get = self.word_to_id.get
+        ids = np.fromiter((get(w, -1) for w in uniques), dtype=np.int64, count=len(uniques))
+        return ids[codes]
+
+    def decode(self, ids):
+        """
+        Retourne les mots correspondant aux identifiants.
+        """
+        return [self.words[i] for i in ids]
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _count_matrix(row_ids, col_ids, n_rows, n_cols):
+    """
+    Construit la matrice CSR des comptages à partir des couples (ligne, colonne) de chaque token.
+    """
+    data = np.ones(len(row_ids), dtype=np.int64)
+    # La conversion COO -> CSR additionne les doublons, c'est-à-dire compte les occurrences
+    matrix = scipy.sparse.coo_matrix((data, (row_ids, col_ids)), shape=(n_rows, n_cols)).tocsr()
+    matrix.sort_indices()
+    return matrix
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class CorpusMatrix:
+    """
+    Représentation compacte du corpus : un vocabulaire global et les comptages par article
+    dans une matrice creuse CSR (articles x vocabulaire).
+
+    Les vues historiques (dict de FreqDist, DataFrame des statistiques) sont reconstruites
+    à la demande par `to_freq` et `to_stats`.
+
+    Args:
+    - products (list): les articles, dans l'ordre des lignes de la matrice.
+    - vocabulary (Vocabulary): le vocabulaire des colonnes de la matrice.
+    - counts (scipy.sparse.csr_matrix): comptages articles x vocabulaire.
+    """
+
+    def __init__(self, products, vocabulary, counts):
+        self.products = list(products)
+        self.vocabulary = vocabulary
+        self.counts = counts.tocsr()
+        self._product_index = None
+
+    @classmethod
+    def from_corpora(cls, corpora, vocabulary=None):
+        """
+        Construit la représentation compacte à partir d'un dictionnaire corpora existant.
+
+        Args:
+        - corpora (dict): Liste des mots pour chaque article.
+        - vocabulary (Vocabulary): vocabulaire à compléter, default = un nouveau vocabulaire.
+
+        Returns:
+        - CorpusMatrix: les comptages articles x vocabulaire.
+        """
+        vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        products = list(corpora)
+        lengths = np.fromiter((len(corpora[p]) for p in products), dtype=np.int64, count=len(products))
+        word_ids = vocabulary.add_all(list(chain.from_iterable(corpora[p] for p in products)))
+        row_ids = np.repeat(np.arange(len(products)), lengths)
+        return cls(products, vocabulary, _count_matrix(row_ids, word_ids, len(products), len(vocabulary)))
+
+    def __len__(self):
+        return len(self.products)
+
+    def _fit_vocabulary(self):
+        # Le vocabulaire a pu grandir depuis la création de la matrice (vocabulaire partagé)
+        if self.counts.shape[1] < len(self.vocabulary):
+            self.counts.resize((self.counts.shape[0], len(self.vocabulary)))
+
+    def row(self, product):
+        """
+        Retourne les comptages d'un article sous forme de FreqDist.
+        """
+        if self._product_index is None:
+            self._product_index = {p: i for i, p in enumerate(self.products)}
+        return self._row_freq(self._product_index[product])
+
+    def _row_freq(self, i):
+        start, end = self.counts.indptr[i], self.counts.indptr[i + 1]
+        words = self.vocabulary.words
+        return nltk.FreqDist({words[j]: int(c) for j, c in zip(self.counts.indices[start:end], self.counts.data[start:end])})
+
+    def to_freq(self):
+        """
+        Reconstruit la vue historique : un FreqDist par article.
+
+        Returns:
+        - freq (dict): Fréquences des mots pour chaque article.
+        """
+        return {product: self._row_freq(i) for i, product in enumerate(self.products)}
+
+    def to_stats(self, extended=False):
+        """
+        Reconstruit le DataFrame des statistiques par article (total et nombre de mots distincts).
+
+        Args:
+        - extended (bool): ajouter les colonnes 'ttr' et 'hapax', default = False.
+
+        Returns:
+        - stats_df (pd.DataFrame): DataFrame des statistiques par article.
+        """
+        totals = np.asarray(self.counts.sum(axis=1)).ravel().astype(np.int64)
+        uniques = np.diff(self.counts.indptr).astype(np.int64)
+        hapaxes = None
+        if extended:
+            # Nombre de cases égales à 1 sur chaque ligne de la matrice
+            rows = np.repeat(np.arange(len(self.products)), uniques)
+            hapaxes = np.bincount(rows[self.counts.data == 1], minlength=len(self.products)).astype(np.int64)
+        return _stats_frame(self.products, totals, uniques, hapaxes)
+
+    def word_counts(self):
+        """
+        Retourne le nombre d'occurrences de chaque mot du vocabulaire sur tout le corpus.
+        """
+        self._fit_vocabulary()
+        return np.asarray(self.counts.sum(axis=0)).ravel()
+
+    def document_frequency(self):
+        """
+        Retourne le nombre d'articles qui contiennent chaque mot du vocabulaire.
+        """
+        self._fit_vocabulary()
+        return np.bincount(self.counts.indices, minlength=len(self.vocabulary))
+
+    def drop_words(self, mask):
+        """
+        Retire des colonnes de la matrice à partir d'un masque booléen sur le vocabulaire,
+        par exemple celui de personal_stopwords(..., as_mask=True), sans rehacher les mots.
+
+        Args:
+        - mask (np.ndarray): True pour chaque mot du vocabulaire à retirer.
+
+        Returns:
+        - CorpusMatrix: nouvelle représentation, avec un vocabulaire réduit.
+        """
+        self._fit_vocabulary()
+        kept = np.flatnonzero(~np.asarray(mask, dtype=bool))
+        vocabulary = Vocabulary()
+        vocabulary.words = [self.vocabulary.words[i] for i in kept]
+        vocabulary.word_to_id = {word: i for i, word in enumerate(vocabulary.words)}
+        return CorpusMatrix(self.products, vocabulary, self.counts[:, kept])
+
+    def most_common(self, n=None):
+        """
+        Retourne les mots les plus fréquents sur tout le corpus, comme Counter.most_common.
+
+        Args:
+        - n (int): nombre de mots à retourner, default = None (tous).
+
+        Returns:
+        - list: liste de tuples (mot, fréquence), triée par fréquence décroissante.
+        """
+        return WordCounts(self.vocabulary.words, self.word_counts()).most_common(n)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class NgramCounts:
+    """
+    Comptages des n-grammes du corpus, encodés par les identifiants entiers du vocabulaire.
+
+    Pour chaque taille n, les n-grammes distincts sont stockés dans un tableau d'entiers
+    (nombre de n-grammes x n) et leurs comptages dans un tableau à part : la mémoire dépend
+    du nombre de n-grammes distincts, pas de la taille du corpus. Les mesures d'association
+    des bigrammes (PMI, rapport de vraisemblance) sont calculées en bloc avec numpy.
+
+    Args:
+    - vocabulary (Vocabulary): le vocabulaire des identifiants.
+    - ngrams (dict): pour chaque taille n, le couple (identifiants (m x n), comptages (m)).
+    """
+
+    def __init__(self, vocabulary, ngrams):
+        self.vocabulary = vocabulary
+        self.ngrams = ngrams
+
+    @classmethod
+    def from_ids(cls, vocabulary, word_ids, rows, max_n=2):
+        """
+        Compte les n-grammes d'une suite d'identifiants de mots, sans franchir les limites de lignes.
+
+        Args:
+        - vocabulary (Vocabulary): le vocabulaire des identifiants.
+        - word_ids (np.ndarray): identifiant de chaque token, dans l'ordre du texte.
+        - rows (np.ndarray): ligne d'origine de chaque token.
+        - max_n (int): taille maximale des n-grammes, default = 2.
+
+        Returns:
+        - NgramCounts: les comptages de n = 1 à max_n.
+        """
+        word_ids = np.asarray(word_ids, dtype=np.int64)
+        rows = np.asarray(rows)
+        ngrams = {1: (np.arange(len(vocabulary)).reshape(-1, 1),
+                      np.bincount(word_ids, minlength=len(vocabulary)))}
+
+        for n in range(2, max_n + 1):
+            n_starts = max(len(word_ids) - n + 1, 0)
+            # Un n-gramme est valide si son premier et son dernier mot viennent de la même ligne
+            valid = rows[:n_starts] == rows[n - 1:n - 1 + n_starts]
+            grams = np.stack([word_ids[i:i + n_starts] for i in range(n)], axis=1)[valid]
+            if len(grams):
+                grams, counts = np.unique(grams, axis=0, return_counts=True)
+            else:
+                grams, counts = grams.reshape(0, n), np.zeros(0, dtype=np.int64)
+            ngrams[n] = (grams, counts)
+
+        return cls(vocabulary, ngrams)
+
+    def most_common(self, n=2, k=None):
+        """
+        Retourne les k n-grammes les plus fréquents de taille n.
+
+        Returns:
+        - list: liste de tuples (n-gramme, fréquence), le n-gramme étant un tuple de mots.
+        """
+        grams, counts = self.ngrams[n]
+        order = np.argsort(-counts, kind='stable')
+        if k is not None:
+            order = order[:k]
+        words = self.vocabulary.words
+        return [(tuple(words[i] for i in grams[j]), int(counts[j])) for j in order]
+
+    def collocations(self, min_count=2, sort_by='llr', top=None):
+        """
+        Calcule les mesures d'association de tous les bigrammes, en bloc.
+
+        Les marginales sont celles de nltk : c1 et c2 = nombre d'occurrences de w1 et de w2,
+        N = nombre total de mots. Les scores sont ceux de BigramAssocMeasures.pmi et
+        likelihood_ratio sur BigramCollocationFinder.from_documents (une ligne par document).
+
+        Args:
+        - min_count (int): fréquence minimale des bigrammes retenus, default = 2.
+        - sort_by (str): 'llr' (rapport de vraisemblance de Dunning) ou 'pmi', default = 'llr'.
+        - top (int): nombre de bigrammes à retourner, default = None (tous).
+
+        Returns:
+        - pd.DataFrame: colonnes 'w1', 'w2', 'count', 'pmi' et 'llr', triées par score décroissant.
+        """
+        grams, counts = self.ngrams[2]
+        word_counts = self.ngrams[1][1].astype(np.float64)
+        n_words = word_counts.sum()
+        first_counts = word_counts[grams[:, 0]]
+        second_counts = word_counts[grams[:, 1]]
+
+        keep = counts >= min_count
+        grams, counts = grams[keep], counts[keep].astype(np.float64)
+        first_counts, second_counts = first_counts[keep], second_counts[keep]
+
+        # Information mutuelle ponctuelle (en bits)
+        pmi = np.log2(counts * n_words / (first_counts * second_counts))
+
+        # G2 = 2 * somme O * ln(O / E) sur les 4 cases de la table de contingence
+        observed = [counts,
+                    first_counts - counts,
+                    second_counts - counts,
+                    n_words - first_counts - second_counts + counts]
+        expected = [first_counts * second_counts / n_words,
+                    first_counts * (n_words - second_counts) / n_words,
+                    (n_words - first_counts) * second_counts / n_words,
+                    (n_words - first_counts) * (n_words - second_counts) / n_words]
+        llr = 2 * sum(scipy.special.xlogy(o, o) - scipy.special.xlogy(o, e) for o, e in zip(observed, expected))
+
+        words = np.asarray(self.vocabulary.words, dtype=object)
+        result = pd.DataFrame({'w1': words[grams[:, 0]],
+                               'w2': words[grams[:, 1]],
+                               'count': counts.astype(np.int64),
+                               'pmi': pmi,
+                               'llr': llr})
+        result = result.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+        return result.head(top) if top is not None else result
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class TextVectorizer:
+    """
+    Matrice documents x termes (comptages bruts ou TF-IDF) construite directement par le pipeline.
+
+    La matrice est produite à partir des tokens déjà calculés pour le corpus, sans retokeniser
+    le texte comme le ferait un vectorizer scikit-learn. Après `fit_transform`, le vocabulaire
+    est figé et `transform` projette de nouveaux articles sans réapprentissage. Les formules
+    sont celles de sklearn.feature_extraction.text.TfidfVectorizer.
+
+    Args:
+    - pipeline (TextPipeline): pipeline de pré traitement, default = TextPipeline().
+    - tfidf (bool): pondération TF-IDF plutôt que comptages bruts, default = True.
+    - smooth_idf (bool): idf = ln((1 + n) / (1 + df)) + 1 plutôt que ln(n / df) + 1, default = True.
+    - sublinear_tf (bool): remplacer tf par 1 + ln(tf), default = False.
+    - norm (str): normalisation des lignes, 'l2', 'l1' ou None, default = 'l2'.
+
+    Example:
+        vectorizer = TextVectorizer(TextPipeline(column='description', lemmatize=True, stopwords=sw))
+        X, freq, stats_df, corpora = vectorizer.fit_transform(df, return_corpus=True)
+        X_new = vectorizer.transform(df_new)
+    """
+
+    def __init__(self, pipeline=None, tfidf=True, smooth_idf=True, sublinear_tf=False, norm='l2'):
+        self.pipeline = pipeline if pipeline is not None else TextPipeline()
+        self.tfidf = tfidf
+        self.smooth_idf = smooth_idf
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.vocabulary_ = None
+        self.idf_ = None
+        self.products_ = None
+
+    def fit_transform(self, df, return_corpus=False):
+        """
+        Apprend le vocabulaire (et les idf) et retourne la matrice des articles de df.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes du pipeline.
+        - return_corpus (bool): retourner aussi (freq, stats_df, corpora), calculés dans la même passe, default = False.
+
+        Returns:
+        - X (scipy.sparse.csr_matrix): matrice articles x vocabulaire, lignes dans l'ordre de `products_`.
+        - freq, stats_df, corpora: si return_corpus est vrai.
+        """
+        pipeline = self.pipeline
+        if pipeline._process is None:
+            pipeline.compile()
+
+        products, tokens, counts = pipeline._tokens_by_product(df)
+        self.vocabulary_ = Vocabulary()
+        word_ids = self.vocabulary_.add_all(tokens)
+        counts_matrix = _count_matrix(np.repeat(np.arange(len(products)), counts), word_ids,
+                                      len(products), len(self.vocabulary_))
+        self.products_ = products
+
+        if self.tfidf:
+            n_documents = len(products)
+            document_frequency = np.bincount(counts_matrix.indices, minlength=len(self.vocabulary_))
+            if self.smooth_idf:
+                self.idf_ = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+            else:
+                self.idf_ = np.log(n_documents / document_frequency) + 1
+
+        X = self._weight(counts_matrix)
+        if not return_corpus:
+            return X
+
+        # Le corpus historique est découpé dans les mêmes tokens, sans nouvelle tokenisation
+        corpora = _group_tokens(products, tokens, counts)
+        freq, stats_df = _freq_and_stats(corpora)
+        freq.word_counts = WordCounts(self.vocabulary_.words, np.asarray(counts_matrix.sum(axis=0)).ravel())
+        return X, freq, stats_df, corpora
+
+    def fit(self, df):
+        """
+        Apprend le vocabulaire (et les idf) sur les articles de df.
+        """
+        self.fit_transform(df)
+        return self
+
+    def transform(self, df, return_products=False):
+        """
+        Projette de nouveaux articles sur le vocabulaire appris, sans le modifier.
+
+        Les mots absents du vocabulaire sont ignorés.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes du pipeline.
+        - return_products (bool): retourner aussi la liste des articles (ordre des lignes), default = False.
+
+        Returns:
+        - X (scipy.sparse.csr_matrix): matrice articles x vocabulaire appris.
+        - products (list): si return_products est vrai.
+        """
+        if self.vocabulary_ is None:
+            raise ValueError("TextVectorizer doit être appris avec fit ou fit_transform avant transform")
+
+        pipeline = self.pipeline
+        if pipeline._process is None:
+            pipeline.compile()
+
+        products, tokens, counts = pipeline._tokens_by_product(df)
+        word_ids = self.vocabulary_.encode(tokens)
+        token_products = np.repeat(np.arange(len(products)), counts)
+        known = word_ids >= 0
+        counts_matrix = _count_matrix(token_products[known], word_ids[known], len(products), len(self.vocabulary_))
+
+        X = self._weight(counts_matrix)
+        return (X, products) if return_products else X
+
+    def _weight(self, counts_matrix):
+        """
+        Applique tf sous-linéaire, idf et normalisation aux comptages bruts.
+        """
+        X = counts_matrix.astype(np.float64) if (self.tfidf or self.sublinear_tf or self.norm) else counts_matrix
+        if self.sublinear_tf:
+            X.data = np.log(X.data) + 1
+        if self.tfidf:
+            # Multiplication de chaque valeur par l'idf de sa colonne
+            X.data *= self.idf_[X.indices]
+        if self.norm:
+            if self.norm == 'l2':
+                row_norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            else:
+                row_norms = np.asarray(abs(X).sum(axis=1)).ravel()
+            row_norms[row_norms == 0] = 1
+            X.data /= np.repeat(row_norms, np.diff(X.indptr))
+        return X
+
+    def get_feature_names_out(self):
+        """
+        Retourne les mots du vocabulaire, dans l'ordre des colonnes de la matrice.
+        """
+        return np.asarray(self.vocabulary_.words, dtype=object)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Pipeline du processus courant, installé une seule fois par `_init_worker`
+_WORKER_PIPELINE = None
+
+def _init_worker(pipeline):
+    """
+    Initialise un processus du pool avec sa copie compilée du pipeline.
+    """
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = pipeline.compile()
+
+def _build_shard(shard, vectorized, count=False, keep_corpora=True):
+    """
+    Construit le corpus partiel d'un bloc de lignes dans un processus du pool, et compte ses
+    fréquences par article si `count` est vrai.
+    """
+    if vectorized:
+        corpora = _WORKER_PIPELINE._build_corpora_by_column(shard)
+    else:
+        corpora = _WORKER_PIPELINE._build_corpora_by_row(shard)
+    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()} if count else None
+    return (dict(corpora) if keep_corpora else None), freq
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _freq_and_stats(corpora, extended_stats=False, profiler=None):
+    """
+    Calcule les fréquences et les statistiques à partir des corpus par article.
+
+    Chaque corpus n'est compté qu'une fois : les statistiques sont lues sur le FreqDist de freq.
+
+    Args:
+    - corpora (dict): Liste des mots pour chaque article.
+    - extended_stats (bool): ajouter les colonnes 'ttr' et 'hapax', default = False.
+    - profiler (PipelineProfiler): mesure des étapes 'freq' et 'stats', default = None.
+
+    Returns:
+    - freq (dict): Fréquences des mots pour chaque article.
+    - stats_df (pd.DataFrame): DataFrame des statistiques par article.
+    """
+    # Calcul des fréquences, en une seule passe de comptage par article
+    with _stage(profiler, 'freq') as span:
+        freq = CorpusFreq((product, nltk.FreqDist(words)) for product, words in corpora.items())
+        if profiler is not None:
+            span.record(tokens_in=sum(map(len, corpora.values())))
+
+    with _stage(profiler, 'stats'):
+        return freq, _stats_from_freq(freq, extended_stats)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _stats_from_freq(freq, extended_stats=False):
+    """
+    Construit le DataFrame des statistiques par article à partir des FreqDist déjà calculés.
+    """
+    products = list(freq)
+    totals = np.fromiter((product_freq.N() for product_freq in freq.values()), dtype=np.int64, count=len(products))
+    uniques = np.fromiter(map(len, freq.values()), dtype=np.int64, count=len(products))
+    hapaxes = None
+    if extended_stats:
+        hapaxes = np.fromiter((sum(1 for c in product_freq.values() if c == 1) for product_freq in freq.values()),
+                              dtype=np.int64, count=len(products))
+    return _stats_frame(products, totals, uniques, hapaxes)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _stats_from_corpora(corpora, extended_stats=False):
+    """
+    Construit le DataFrame des statistiques par article directement à partir des listes de mots.
+    """
+    products = list(corpora)
+    lengths = np.fromiter(map(len, corpora.values()), dtype=np.int64, count=len(products))
+    tokens = np.array(list(chain.from_iterable(corpora.values())), dtype=object)
+    return _stats_from_tokens(products, tokens, lengths, extended_stats)
+
+def _stats_from_tokens(products, tokens, lengths, extended_stats=False):
+    """
+    Construit le DataFrame des statistiques par article à partir des tokens regroupés par article
+    (`lengths` tokens pour chaque article, dans l'ordre), en comptant les couples (article, mot) distincts.
+    """
+    codes, words = pd.factorize(np.asarray(tokens, dtype=object))
+    rows = np.repeat(np.arange(len(products)), lengths)
+    pairs, pair_counts = np.unique(rows * max(len(words), 1) + codes, return_counts=True)
+    pair_rows = pairs // max(len(words), 1)
+
+    uniques = np.bincount(pair_rows, minlength=len(products)).astype(np.int64)
+    hapaxes = None
+    if extended_stats:
+        hapaxes = np.bincount(pair_rows[pair_counts == 1], minlength=len(products)).astype(np.int64)
+    return _stats_frame(products, np.asarray(lengths, dtype=np.int64), uniques, hapaxes)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _stats_frame(products, totals, uniques, hapaxes=None):
+    """
+    Assemble le DataFrame des statistiques par article.
+
+    Args:
+    - products (list): les articles (index du DataFrame).
+    - totals (np.ndarray): nombre total de mots de chaque article.
+    - uniques (np.ndarray): nombre de mots distincts de chaque article.
+    - hapaxes (np.ndarray): nombre de mots présents une seule fois, default = None (statistiques de base).
+
+    Returns:
+    - stats_df (pd.DataFrame): colonnes 'total', 'unique' et, si hapaxes est fourni, 'ttr' et 'hapax'.
+    """
+    stats_df = pd.DataFrame({'total': totals, 'unique': uniques}, index=pd.Index(products, dtype=object))
+    if hapaxes is not None:
+        # Type/token ratio : richesse du vocabulaire de l'article (0 pour un article vide)
+        stats_df['ttr'] = np.divide(uniques, totals, out=np.zeros(len(totals)), where=totals > 0)
+        stats_df['hapax'] = hapaxes
+    return stats_df
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def freq_stats_from_csv(path, pipeline=None, chunksize=100_000, keep_corpora=False, extended_stats=False, backend='exact',
+                        **read_csv_kwargs):
+    """
+    Calcule les fréquences et les statistiques d'un fichier CSV lu par blocs, sans le charger en entier.
+
+    Args:
+    - path (str): chemin du fichier CSV du catalogue.
+    - pipeline (TextPipeline): pipeline à appliquer, default = TextPipeline() sur la colonne 'description'.
+    - chunksize (int): nombre de lignes lues à la fois, default = 100_000.
+    - keep_corpora (bool): conserver aussi la liste des mots de chaque article, default = False.
+    - extended_stats (bool): ajouter les colonnes 'ttr' et 'hapax' aux statistiques, default = False.
+    - backend (str or ApproximateWordCounts): 'exact' ou comptages approximés à mémoire fixe
+      (voir TextPipeline.run_chunks), default = 'exact'.
+    - read_csv_kwargs: options supplémentaires passées à pd.read_csv (sep, encoding...).
+
+    Returns:
+    - freq (dict): Fréquences des mots pour chaque article.
+    - stats_df (pd.DataFrame): DataFrame des statistiques par article.
+    - corpora (defaultdict): Liste des mots retenus pour chaque article, None si keep_corpora est faux.
+
+    Example:
+        pipeline = TextPipeline(column='description', lemmatize=True, stopwords=sw)
+        freq, stats_df, _ = freq_stats_from_csv('flipkart_com-ecommerce_sample_1050.csv', pipeline)
+    """
+    if pipeline is None:
+        pipeline = TextPipeline()
+
+    # Seules les colonnes utiles au pipeline sont lues, comme du texte (un champ vide reste une chaîne vide)
+    read_csv_kwargs.setdefault('usecols', list(dict.fromkeys([pipeline.group_by, pipeline.column])))
+    read_csv_kwargs.setdefault('dtype', str)
+    read_csv_kwargs.setdefault('keep_default_na', False)
+
+    with pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs) as reader:
+        return pipeline.run_chunks(reader, keep_corpora=keep_corpora, extended_stats=extended_stats, backend=backend)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class IncrementalCorpus:
+    """
+    Résultat (freq, stats_df, corpora) mis à jour de manière incrémentale quand le catalogue change.
+
+    Seuls les articles concernés par les lignes ajoutées, supprimées ou modifiées sont
+    recalculés. Un compteur global des mots est maintenu à chaque mise à jour, pour que
+    get_most_common_words et create_set_personal_stopwords restent cohérents sans tout reconstruire.
+
+    Les lignes modifiées remplacent toutes les lignes existantes de leur article : il faut
+    donc fournir toutes les lignes d'un article modifié, pas seulement celles qui ont changé.
+
+    Args:
+    - pipeline (TextPipeline): pipeline appliqué aux nouvelles lignes.
+    - freq (dict): fréquences d'un résultat existant à reprendre, default = None.
+    - corpora (dict): corpus d'un résultat existant à reprendre, default = None.
+    - keep_corpora (bool): maintenir aussi la liste des mots de chaque article, default = True.
+
+    Example:
+        corpus = IncrementalCorpus(pipeline)
+        corpus.apply(added=df)
+        affected = corpus.apply(added=new_rows, removed=['Old product'], modified=changed_rows)
+        freq, stats_df, corpora = corpus.result()
+    """
+
+    def __init__(self, pipeline, freq=None, corpora=None, keep_corpora=True):
+        self.pipeline = pipeline
+        self.keep_corpora = keep_corpora
+        # Copies profondes : les mises à jour ne doivent pas modifier le résultat d'origine
+        self.freq = {product: nltk.FreqDist(product_freq) for product, product_freq in (freq or {}).items()}
+        self.corpora = (defaultdict(list, {product: list(words) for product, words in (corpora or {}).items()})
+                        if keep_corpora else None)
+        self.total_freq = Counter()
+        for product_freq in self.freq.values():
+            self.total_freq.update(product_freq)
+
+    def apply(self, added=None, removed=None, modified=None):
+        """
+        Applique des lignes ajoutées, des articles supprimés et des lignes modifiées.
+
+        Args:
+        - added (pd.DataFrame): nouvelles lignes, ajoutées aux articles existants ou nouveaux, default = None.
+        - removed (str, list or pd.DataFrame): article ou articles à supprimer (noms ou lignes), default = None.
+        - modified (pd.DataFrame): nouvelles lignes des articles modifiés, default = None.
+
+        Returns:
+        - set: les articles concernés par la mise à jour.
+        """
+        group_by = self.pipeline.group_by
+        affected = set()
+
+        if removed is not None:
+            if isinstance(removed, pd.DataFrame):
+                removed = removed[group_by]
+            elif not pd.api.types.is_list_like(removed):
+                # Un nom d'article seul (itérer sur une chaîne donnerait ses caractères)
+                removed = [removed]
+            for product in removed:
+                # Un article inconnu n'est pas concerné par la mise à jour
+                if self._remove(product):
+                    affected.add(product)
+
+        if modified is not None:
+            # Un article modifié est retiré puis reconstruit à partir de ses nouvelles lignes
+            for product in pd.unique(modified[group_by]):
+                self._remove(product)
+            affected.update(self._add(modified))
+
+        if added is not None:
+            affected.update(self._add(added))
+
+        return affected
+
+    def _add(self, df):
+        if self.pipeline._process is None:
+            self.pipeline.compile()
+
+        partial = self.pipeline._build_corpora_by_column(df)
+        for product, words in partial.items():
+            if product not in self.freq:
+                self.freq[product] = nltk.FreqDist()
+            self.freq[product].update(words)
+            self.total_freq.update(words)
+            if self.keep_corpora:
+                self.corpora[product] += words
+        return partial.keys()
+
+    def _remove(self, product):
+        if product not in self.freq:
+            return False
+        product_freq = self.freq.pop(product)
+        if self.keep_corpora:
+            self.corpora.pop(product, None)
+
+        # Mise à jour du compteur global, en retirant les mots qui n'apparaissent plus
+        total_freq = self.total_freq
+        for word, count in product_freq.items():
+            remaining = total_freq[word] - count
+            if remaining > 0:
+                total_freq[word] = remaining
+            else:
+                del total_freq[word]
+        return True
+
+    def stats(self, extended_stats=False):
+        """
+        Retourne le DataFrame des statistiques par article.
+        """
+        return _stats_from_freq(self.freq, extended_stats)
+
+    def result(self, extended_stats=False):
+        """
+        Retourne le triplet habituel (freq, stats_df, corpora).
+        """
+        return self.freq, self.stats(extended_stats), self.corpora
+
+    def most_common(self, n=None):
+        """
+        Retourne les mots les plus fréquents sur tout le corpus, à partir du compteur global.
+        """
+        return self.total_freq.most_common(n)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Version du traitement des textes, à incrémenter à chaque changement qui modifie les tokens produits
+CORPUS_CACHE_VERSION = 2
+
+def corpus_fingerprint(df, pipeline):
+    """
+    Calcule l'empreinte (sha256) d'un traitement : contenu des colonnes lues, configuration du pipeline
+    et version du traitement (CORPUS_CACHE_VERSION et version de NLTK).
+
+    Args:
+    - df (pd.DataFrame): DataFrame contenant les colonnes du pipeline.
+    - pipeline (TextPipeline): pipeline appliqué.
+
+    Returns:
+    - str: l'empreinte hexadécimale.
+    """
+    digest = hashlib.sha256()
+
+    # Configuration du pipeline (les ensembles sont triés pour être indépendants de l'ordre), avec la
+    # version du traitement et de NLTK : un changement de tokenisation ne doit pas relire d'anciennes entrées
+    config = {'version': CORPUS_CACHE_VERSION,
+              'nltk': nltk.__version__,
+              'column': pipeline.column,
+              'group_by': pipeline.group_by,
+              'pattern': pipeline.pattern,
+              'lemmatize': bool(pipeline.lemmatize),
+              'min_length': pipeline.min_length,
+              'stopwords': sorted(pipeline.stopwords or ()),
+              'valid_words': None if pipeline.valid_words is None else _set_fingerprint(pipeline.valid_words)}
+    digest.update(json.dumps(config, ensure_ascii=False).encode('utf-8'))
+
+    # Contenu des colonnes, haché ligne par ligne de manière vectorisée par pandas
+    columns = list(dict.fromkeys([pipeline.group_by, pipeline.column]))
+    digest.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+# Empreintes des grands ensembles (dictionnaire NLTK), calculées une seule fois par objet
+_SET_FINGERPRINTS = {}
+
+def _set_fingerprint(words):
+    key = id(words)
+    cached = _SET_FINGERPRINTS.get(key)
+    if cached is not None and cached[0] is words:
+        return cached[1]
+    fingerprint = hashlib.sha256('\n'.join(sorted(words)).encode('utf-8')).hexdigest()
+    # Seuls les ensembles immuables peuvent être mémorisés sans risque
+    if isinstance(words, frozenset):
+        _SET_FINGERPRINTS[key] = (words, fingerprint)
+    return fingerprint
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+class CorpusCache:
+    """
+    Cache disque des corpus traités, adressé par l'empreinte de l'entrée et de la configuration.
+
+    Chaque entrée est un dossier qui contient le vocabulaire et les articles (meta.json) et les
+    trois tableaux de la matrice CSR des comptages (data.npy, indices.npy, indptr.npy), relus
+    en mémoire partagée (np.load avec mmap_mode='r'). Les fréquences et les statistiques sont
+    reconstruites par CorpusMatrix.to_freq() et to_stats(). Les listes de tokens (corpora) sont
+    conservées quand elles sont fournies, encodées par les identifiants du vocabulaire
+    (tokens.npy, lengths.npy) : c'est le cas de run_text, utilisé par process_text et
+    process_final_text avec leur argument `cache`.
+
+    Quand la taille totale dépasse `max_bytes`, les entrées utilisées il y a le plus longtemps
+    sont supprimées (jamais celle qui vient d'être écrite).
+
+    Args:
+    - directory (str): dossier du cache, créé si besoin.
+    - max_bytes (int): taille maximale du cache, default = 1 Go.
+
+    Example:
+        cache = CorpusCache('cache_corpus')
+        matrix = cache.run(df, TextPipeline(column='description', lemmatize=True, stopwords=sw))
+        freq, stats_df = matrix.to_freq(), matrix.to_stats()
+        freq, stats_df, corpora = process_final_text(df, sw, 'description', cache=cache)
+    """
+
+    ARRAYS = ('data', 'indices', 'indptr')
+    CORPORA_ARRAYS = ('tokens', 'lengths')
+
+    def __init__(self, directory, max_bytes=1_000_000_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, df, pipeline, mmap=True):
+        """
+        Retourne la représentation compacte en cache pour ce traitement, ou None.
+        """
+        return self.load(corpus_fingerprint(df, pipeline), mmap=mmap)
+
+    def load(self, key, mmap=True):
+        """
+        Relit une entrée par son empreinte, ou retourne None si elle n'existe pas.
+        """
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+                meta = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        data, indices, indptr = (np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+                                 for name in self.ARRAYS)
+        counts = scipy.sparse.csr_matrix((data, indices, indptr), shape=tuple(meta['shape']))
+
+        # Date d'accès mise à jour pour l'éviction LRU
+        os.utime(os.path.join(path, 'meta.json'))
+        return CorpusMatrix(meta['products'], Vocabulary(meta['words']), counts)
+
+    def load_corpora(self, key, mmap=True):
+        """
+        Relit les listes de tokens d'une entrée, ou retourne None si elles n'ont pas été conservées.
+        """
+        matrix = self.load(key, mmap=mmap)
+        path = self._path(key)
+        if matrix is None or not os.path.exists(os.path.join(path, 'lengths.npy')):
+            return None
+
+        tokens, lengths = (np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+                           for name in self.CORPORA_ARRAYS)
+        words = np.asarray(matrix.vocabulary.words, dtype=object)
+        return _group_tokens(matrix.products, words[tokens], lengths)
+
+    def put(self, df, pipeline, matrix, corpora=None):
+        """
+        Enregistre la représentation compacte d'un traitement (et ses corpora s'ils sont donnés) et retourne son empreinte.
+        """
+        return self._store(corpus_fingerprint(df, pipeline), matrix, corpora)
+
+    def _store(self, key, matrix, corpora=None):
+        matrix._fit_vocabulary()
+        counts = matrix.counts
+
+        # Écriture dans un dossier temporaire puis renommage, pour ne jamais exposer une entrée partielle
+        tmp_path = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            for name in self.ARRAYS:
+                np.save(os.path.join(tmp_path, f'{name}.npy'), getattr(counts, name))
+            if corpora is not None:
+                # Tokens de chaque article, dans l'ordre des lignes de la matrice, encodés par le vocabulaire
+                lengths = np.fromiter((len(corpora[p]) for p in matrix.products), dtype=np.int64, count=len(matrix))
+                tokens = matrix.vocabulary.encode(list(chain.from_iterable(corpora[p] for p in matrix.products)))
+                np.save(os.path.join(tmp_path, 'tokens.npy'), tokens)
+                np.save(os.path.join(tmp_path, 'lengths.npy'), lengths)
+            with open(os.path.join(tmp_path, 'meta.json'), mode='w', encoding='utf-8') as file:
+                json.dump({'products': matrix.products,
+                           'words': matrix.vocabulary.words,
+                           'shape': list(counts.shape),
+                           'created': time.time()}, file, ensure_ascii=False)
+            self.invalidate(key=key)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        self.evict(keep=key)
+        return key
+
+    def run(self, df, pipeline):
+        """
+        Retourne la représentation compacte du traitement, depuis le cache ou en la calculant.
+        """
+        matrix = self.get(df, pipeline)
+        if matrix is None:
+            matrix = pipeline.run_matrix(df)
+            self.put(df, pipeline, matrix)
+        return matrix
+
+    def run_text(self, df, pipeline, n_jobs=1, extended_stats=False):
+        """
+        Retourne le triplet (freq, stats_df, corpora) du traitement, depuis le cache ou en le calculant.
+
+        Une entrée en cache évite la tokenisation, la lemmatisation et le filtrage, mais pas tout
+        le coût : toute la colonne est encore lue pour calculer l'empreinte, et les corpora sont
+        relus et décodés depuis le disque. Le gain est donc relatif au traitement complet.
+
+        Args:
+        - df (pd.DataFrame): DataFrame contenant les colonnes du pipeline.
+        - pipeline (TextPipeline): pipeline appliqué.
+        - n_jobs (int): nombre de processus si le traitement doit être calculé, default = 1.
+        - extended_stats (bool): ajouter les colonnes 'ttr' et 'hapax' aux statistiques, default = False.
+
+        Returns:
+        - freq (dict): Fréquences des mots pour chaque article.
+        - stats_df (pd.DataFrame): DataFrame des statistiques par article.
+        - corpora (defaultdict): Liste des mots retenus pour chaque article.
+        """
+        key = corpus_fingerprint(df, pipeline)
+        corpora = self.load_corpora(key)
+        if corpora is None:
+            freq, stats_df, corpora = pipeline.run(df, n_jobs=n_jobs, extended_stats=extended_stats)
+            self._store(key, CorpusMatrix.from_corpora(corpora), corpora)
+            return freq, stats_df, corpora
+
+        matrix = self.load(key)
+        freq = CorpusFreq(matrix.to_freq())
+        freq.word_counts = WordCounts(matrix.vocabulary.words, matrix.word_counts())
+        return freq, matrix.to_stats(extended=extended_stats), corpora
+
+    def invalidate(self, df=None, pipeline=None, key=None):
+        """
+        Supprime l'entrée d'un traitement (df et pipeline) ou d'une empreinte (key).
+
+        Returns:
+        - bool: True si une entrée a été supprimée.
+        """
+        if key is None:
+            key = corpus_fingerprint(df, pipeline)
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return False
+        shutil.rmtree(path)
+        return True
+
+    def clear(self):
+        """
+        Supprime toutes les entrées du cache.
+        """
+        for key, _, _ in self.entries():
+            self.invalidate(key=key)
+
+    def entries(self):
+        """
+        Liste les entrées du cache : (empreinte, taille en octets, date du dernier accès).
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            path = self._path(key)
+            if key.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            try:
+                last_used = os.path.getmtime(os.path.join(path, 'meta.json'))
+            except FileNotFoundError:
+                continue
+            entries.append((key, size, last_used))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Supprime les entrées les moins récemment utilisées tant que le cache dépasse max_bytes.
+
+        Args:
+        - keep (str): empreinte d'une entrée à ne jamais supprimer (celle qui vient d'être écrite), default = None.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.invalidate(key=key)
+            total -= size
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -38,28 +2372,7 @@ def freq_stats_for_description(df):
     - freq (dict): Fréquences des mots pour chaque article.
     - stats (pd.DataFrame): DataFrame des statistiques par article.
     """
-    corpora = defaultdict(list)
-
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        description = row['description']
-        
-        # Tokenisation de la description
-        tokens = tokenizer.tokenize(description.lower())
-        corpora[product] += tokens
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    return TextPipeline(column='description').run(df)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -74,28 +2387,7 @@ def freq_stats_for_product_name(df):
     - freq (dict): Fréquences des mots du product_name pour chaque article.
     - stats (pd.DataFrame): DataFrame des statistiques par article.
     """
-    corpora = defaultdict(list)
-
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        product_tokens = row['product_name']
-        
-        # Tokenisation de la description
-        tokens = tokenizer.tokenize(product_tokens.lower())
-        corpora[product] += tokens
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    return TextPipeline(column='product_name').run(df)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -110,28 +2402,7 @@ def freq_stats_for_description_without_stopwords(df, sw):
     - freq (dict): Fréquences des mots pour chaque article.
     - stats (pd.DataFrame): DataFrame des statistiques par article.
     """
-    corpora = defaultdict(list)
-
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        description = row['description']
-        
-        # Tokenisation de la description
-        tokens = tokenizer.tokenize(description.lower())
-        corpora[product] += [w for w in tokens if not w in sw]
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    return TextPipeline(column='description', stopwords=sw).run(df)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -146,38 +2417,11 @@ def freq_stats_for_description_without_stopwords_and_with_lemmatizer(df, sw):
     - freq (dict): Fréquences des mots pour chaque article.
     - stats (pd.DataFrame): DataFrame des statistiques par article.
     """
-    # Initialiser le lemmatizer
-    lemmatizer = WordNetLemmatizer()
-
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
-    
-    corpora = defaultdict(list)
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        description = row['description']
-        
-        # Tokenisation de la description
-        tokens = tokenizer.tokenize(description.lower())
-        # Lemmatisation des mots (tokens)
-        lemmatized_tokens = [lemmatizer.lemmatize(w) for w in tokens]
-        # Suppression des stopwords (sw)
-        corpora[product] += [w for w in lemmatized_tokens if w not in sw]
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    return TextPipeline(column='description', lemmatize=True, stopwords=sw).run(df)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
-def process_text(df, sw, column):
+def process_text(df, sw, column, n_jobs=1, profiler=None, cache=None):
     """
     Processes text data from a DataFrame, calculates word frequencies, and removes stopwords 
     while lemmatizing the words. It also filters out non-English words using a provided 
@@ -196,6 +2440,10 @@ def process_text(df, sw, column):
             - 'description': The description of the product.
         sw (set): A set of stopwords to exclude from the word list.
         column (string) : name of column for the process.
+        n_jobs (int) : number of worker processes, -1 for all cores, default = 1.
+        profiler (PipelineProfiler) : collects per-stage timings and token counts, default = None.
+        cache (CorpusCache) : on-disk cache of processed corpora, reused when the same column and
+            settings were already processed, default = None.
 
     Returns:
         freq (dict): A dictionary where the keys are product names and the values are 
@@ -207,44 +2455,17 @@ def process_text(df, sw, column):
             and English word filtering.
     """
 
-    # Initialiser le lemmatizer
-    lemmatizer = WordNetLemmatizer()
-
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
+    # Liste des mots valides en anglais (dictionnaire de NLTK, construit une seule fois)
+    valid_words = RESOURCES.valid_words()
 
-    # Télécharger le dictionnaire de mots si vous ne l'avez pas encore fait
-    nltk.download('words')
-
-    # Liste des mots valides en anglais (dictionnaire de NLTK)
-    valid_words = set(words.words())
-    
-    corpora = defaultdict(list)
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        column_to_tokenize = row[column]
-        
-        # Tokenisation de la colonne demandée
-        tokens = tokenizer.tokenize(column_to_tokenize.lower())
-        # Lemmatisation des mots (tokens)
-        lemmatized_tokens = [lemmatizer.lemmatize(w) for w in tokens]
-        # Suppression des stopwords (sw) et des mots qui ne sont pas dans le dictionnaire anglais
-        corpora[product] += [w for w in lemmatized_tokens if w not in sw and w in valid_words]
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    pipeline = TextPipeline(column=column, lemmatize=True, stopwords=sw, valid_words=valid_words, profiler=profiler)
+    if cache is not None:
+        return cache.run_text(df, pipeline, n_jobs=n_jobs)
+    return pipeline.run(df, n_jobs=n_jobs)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
-def process_final_text(df, sw, column):
+def process_final_text(df, sw, column, n_jobs=1, profiler=None, cache=None):
     """
     Processes text data from a DataFrame, calculates word frequencies, and removes stopwords 
     while lemmatizing the words. It also filters out non-English words using a provided 
@@ -264,6 +2485,10 @@ def process_final_text(df, sw, column):
             - 'description': The description of the product.
         sw (set): A set of stopwords to exclude from the word list.
         column (string) : name of column for the process.
+        n_jobs (int) : number of worker processes, -1 for all cores, default = 1.
+        profiler (PipelineProfiler) : collects per-stage timings and token counts, default = None.
+        cache (CorpusCache) : on-disk cache of processed corpora, reused when the same column and
+            settings were already processed, default = None.
 
     Returns:
         freq (dict): A dictionary where the keys are product names and the values are 
@@ -275,41 +2500,15 @@ def process_final_text(df, sw, column):
             and English word filtering.
     """
 
-    # Initialiser le lemmatizer
-    lemmatizer = WordNetLemmatizer()
+    # Liste des mots valides en anglais (dictionnaire de NLTK, construit une seule fois)
+    valid_words = RESOURCES.valid_words()
 
-    # tokenizer pour conserver uniquement les caractères alphanumériques
-    tokenizer = nltk.RegexpTokenizer(r'\w+')
-
-    # Télécharger le dictionnaire de mots si vous ne l'avez pas encore fait
-    nltk.download('words')
-
-    # Liste des mots valides en anglais (dictionnaire de NLTK)
-    valid_words = set(words.words())
-    
-    corpora = defaultdict(list)
-    
-    # Construction du corpus par image
-    for _, row in df.iterrows():
-        product = row['product_name']
-        column_to_tokenize = row[column]
-        
-        # Tokenisation de la colonne demandée
-        tokens = tokenizer.tokenize(column_to_tokenize.lower())
-        # Lemmatisation des mots (tokens)
-        lemmatized_tokens = [lemmatizer.lemmatize(w) for w in tokens]
-        # Suppression des stopwords (sw) et des mots qui ne sont pas dans le dictionnaire anglais, 
-        # et des mots de moins de 2 lettres
-        corpora[product] += [w for w in lemmatized_tokens if w not in sw and w in valid_words and len(w) > 2]
-    
-    # Calcul des fréquences et des statistiques
-    freq = {product: nltk.FreqDist(words) for product, words in corpora.items()}
-    stats = {product: {'total': len(words), 'unique': len(nltk.FreqDist(words).keys())} for product, words in corpora.items()}
-    
-    # Conversion des statistiques en DataFrame
-    stats_df = pd.DataFrame.from_dict(stats, orient='index')
-    
-    return freq, stats_df, corpora
+    # Suppression des mots de moins de 2 lettres
+    pipeline = TextPipeline(column=column, lemmatize=True, stopwords=sw, valid_words=valid_words, min_length=3,
+                            profiler=profiler)
+    if cache is not None:
+        return cache.run_text(df, pipeline, n_jobs=n_jobs)
+    return pipeline.run(df, n_jobs=n_jobs)
 
 
 # ----------------------------------------------------------------------------------------------------------------------------
@@ -330,46 +2529,196 @@ def create_set_personal_stopwords(most_common_words, unique, numerical):
 
     # On créé notre set de stopwords avec l'ensemble de stopwords par défaut présent dans la librairie NLTK
     sw = set()
-    sw.update(tuple(nltk.corpus.stopwords.words('english')))
+    sw.update(RESOURCES.stopwords('english'))
+
+    if (unique or numerical) and most_common_words:
+        # Sélection des mots présents une seule fois et/ou des tokens numériques, en une seule passe
+        words, counts = zip(*most_common_words)
+        words = np.array(words, dtype=object)
+        mask = personal_stopwords_mask(words, counts, unique=unique, numerical=numerical, include_nltk=False)
+        sw.update(words[mask].tolist())
+
+    return sw
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def personal_stopwords_mask(words,
+                            counts,
+                            document_frequency=None,
+                            n_documents=None,
+                            unique=False,
+                            numerical=False,
+                            min_df=None,
+                            max_df=None,
+                            pattern=None,
+                            include_nltk=True,
+                            language='english'):
+    """
+    Sélectionne les stopwords d'un vocabulaire avec des masques vectorisés sur les tableaux de comptages.
+
+    Chaque règle produit un masque booléen sur le vocabulaire, les masques sont combinés par un OU.
+
+    Args:
+    - words (np.ndarray): les mots du vocabulaire.
+    - counts (np.ndarray): le nombre d'occurrences de chaque mot sur tout le corpus.
+    - document_frequency (np.ndarray): le nombre d'articles contenant chaque mot, requis pour min_df et max_df.
+    - n_documents (int): le nombre d'articles, requis pour les seuils exprimés en proportion.
+    - unique (bool): ajouter les mots présents une seule fois, default = False.
+    - numerical (bool): ajouter les mots composés uniquement de chiffres, default = False.
+    - min_df (int or float): ajouter les mots présents dans moins de min_df articles
+      (en proportion des articles si c'est un float), default = None.
+    - max_df (int or float): ajouter les mots présents dans plus de max_df articles
+      (en proportion des articles si c'est un float), default = None.
+    - pattern (str): ajouter les mots qui correspondent entièrement à cette expression régulière,
+      par exemple r'[a-z]\d+' , default = None.
+    - include_nltk (bool): ajouter les stopwords NLTK de la langue, default = True.
+    - language (str): langue des stopwords NLTK, default = 'english'.
+
+    Returns:
+    - np.ndarray: masque booléen, True pour chaque mot du vocabulaire à considérer comme stopword.
+    """
+    words = np.asarray(words, dtype=object)
+    counts = np.asarray(counts)
+    mask = np.zeros(len(words), dtype=bool)
 
     if unique:
-        # Suppression des mots présents une seule fois
-        unique_tokens = []
-        for word, count in most_common_words:
-            if count == 1:
-                unique_tokens.append(word)
-        sw.update(unique_tokens)
+        mask |= counts == 1
 
     if numerical:
-        # suppression des tokens avec des chiffres
-        numerical_tokens = []
-        for word, count in most_common_words:
-            if word.isdigit():
-                numerical_tokens.append(word)
-        sw.update(numerical_tokens)
+        mask |= np.fromiter(map(str.isdigit, words), dtype=bool, count=len(words))
 
-    return sw
+    if min_df is not None or max_df is not None:
+        if document_frequency is None:
+            raise ValueError("min_df et max_df nécessitent document_frequency")
+        document_frequency = np.asarray(document_frequency)
+        if min_df is not None:
+            mask |= document_frequency < _df_threshold(min_df, n_documents)
+        if max_df is not None:
+            mask |= document_frequency > _df_threshold(max_df, n_documents)
+
+    if pattern is not None:
+        mask |= pd.Series(words, dtype=object).str.fullmatch(pattern).to_numpy(dtype=bool)
+
+    if include_nltk:
+        mask |= pd.Index(words, dtype=object).isin(RESOURCES.stopwords(language))
+
+    return mask
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _df_threshold(threshold, n_documents):
+    """
+    Convertit un seuil de fréquence documentaire (entier ou proportion) en nombre d'articles.
+    """
+    if isinstance(threshold, float):
+        if n_documents is None:
+            raise ValueError("un seuil en proportion nécessite n_documents")
+        return threshold * n_documents
+    return threshold
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def personal_stopwords(corpus, as_mask=False, **rules):
+    """
+    Sélectionne les stopwords d'un corpus à partir de ses comptages globaux.
+
+    Args:
+    - corpus (CorpusMatrix, CorpusFreq, IncrementalCorpus, ApproximateWordCounts or dict): le corpus. Les règles
+      min_df et max_df nécessitent une CorpusMatrix, qui fournit les fréquences documentaires. Avec des
+      comptages approximés, seuls les mots fréquents suivis sont examinés, et la règle unique lève une
+      ValueError dès que des hapax ont pu sortir de l'ensemble suivi.
+    - as_mask (bool): retourner le masque booléen sur le vocabulaire plutôt qu'un ensemble, default = False.
+      Le masque s'applique directement avec CorpusMatrix.drop_words.
+    - rules: règles de personal_stopwords_mask (unique, numerical, min_df, max_df, pattern, include_nltk, language).
+
+    Returns:
+    - frozenset or np.ndarray: les stopwords, ou le masque sur le vocabulaire de la CorpusMatrix.
+
+    Example:
+        matrix = pipeline.run_matrix(df)
+        mask = personal_stopwords(matrix, as_mask=True, unique=True, numerical=True, max_df=0.5)
+        matrix = matrix.drop_words(mask)
+    """
+    word_counts = _word_counts(corpus)
+    if isinstance(word_counts, ApproximateWordCounts) and rules.get('unique'):
+        # Les hapax sont les premiers mots à sortir de l'ensemble suivi
+        word_counts._check_complete(1)
+    if isinstance(corpus, CorpusMatrix):
+        rules.setdefault('document_frequency', corpus.document_frequency())
+        rules.setdefault('n_documents', len(corpus))
+
+    mask = personal_stopwords_mask(word_counts.words, word_counts.counts, **rules)
+
+    if as_mask:
+        return mask
+    words = word_counts.words[mask].tolist()
+    if rules.get('include_nltk', True):
+        # Les stopwords NLTK absents du corpus font aussi partie de l'ensemble, comme dans create_set_personal_stopwords
+        words += RESOURCES.stopwords(rules.get('language', 'english'))
+    return frozenset(words)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
 # Obtenir le classement des mots les plus présents
-def get_most_common_words(freq):
+def get_most_common_words(freq, n=None):
     """
     Récupère les mots les plus fréquents sur tout le corpus.
     
     Args:
-    - freq (dict): Dictionnaire des fréquences pour chaque article.
+    - freq (dict, CorpusMatrix, IncrementalCorpus or ApproximateWordCounts): Dictionnaire des fréquences
+      pour chaque article, représentation compacte, corpus incrémental ou comptages approximés.
+    - n (int): nombre de mots à retourner, default = None (tous).
     
     Returns:
     - sorted_words (list): Liste des mots triés par fréquence (mot, fréquence).
     """
-    # Combiner toutes les fréquences dans un Counter global
-    total_freq = Counter()
-    for product, product_freq in freq.items():
-        total_freq.update(product_freq)
-    
-    # Trier par fréquence et retourner
-    return total_freq.most_common()
+    return _word_counts(freq).most_common(n)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def get_words_with_count(freq, count=1):
+    """
+    Récupère les mots présents exactement `count` fois sur tout le corpus (les hapax par défaut).
+
+    Args:
+    - freq (dict, CorpusMatrix or IncrementalCorpus): fréquences du corpus.
+    - count (int): nombre d'occurrences recherché, default = 1.
+
+    Returns:
+    - list: les mots, dans l'ordre d'apparition.
+    """
+    return _word_counts(freq).with_count(count)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def get_numeric_words(freq):
+    """
+    Récupère les mots composés uniquement de chiffres sur tout le corpus.
+
+    Args:
+    - freq (dict, CorpusMatrix or IncrementalCorpus): fréquences du corpus.
+
+    Returns:
+    - list: les mots, dans l'ordre d'apparition.
+    """
+    return _word_counts(freq).numeric()
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def _word_counts(freq):
+    """
+    Retourne les comptages globaux (WordCounts) d'un corpus, sans refusionner ceux déjà maintenus.
+    """
+    if isinstance(freq, CorpusFreq):
+        return freq.word_counts
+    if isinstance(freq, (WordCounts, ApproximateWordCounts)):
+        return freq
+    if isinstance(freq, CorpusMatrix):
+        return WordCounts(freq.vocabulary.words, freq.word_counts())
+    if isinstance(freq, IncrementalCorpus):
+        total_freq = freq.total_freq
+        return WordCounts(list(total_freq.keys()), np.fromiter(total_freq.values(), dtype=np.int64, count=len(total_freq)))
+    return WordCounts.from_freq(freq)
 
 # ----------------------------------------------------------------------------------------------------------------------------
 
@@ -437,10 +2786,63 @@ def clean_category_first_level(category):
         str: The cleaned first-level category as a string.
     """
 
-    # Sélectionner la catégorie de premier niveau
-    cat_first_level = category.split(">>")[0].strip()
+    return clean_category_level(category, 0)
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+# Caractères à supprimer des catégories (tout sauf alphanumériques et espaces), compilé une seule fois
+_CATEGORY_UNWANTED_CHARS = re.compile(r'[^a-zA-Z0-9 ]')
+
+def clean_category_level(category, level=0):
+
+    """
+    Extract one level of a '>>' category hierarchy and clean it.
+
+    Args:
+        category (str): The category string containing hierarchical levels.
+        level (int): Index of the level to extract, 0 for the first level, -1 for the last one.
+
+    Returns:
+        str: The cleaned category level, or None if the hierarchy has no such level.
+    """
+
+    levels = category.split(">>")
+    if not -len(levels) <= level < len(levels):
+        return None
 
     # Conserver uniquement les caractères alphanumériques et les espaces
-    result = re.sub(r'[^a-zA-Z0-9 ]', '', cat_first_level)
+    return _CATEGORY_UNWANTED_CHARS.sub('', levels[level].strip())
+
+# ----------------------------------------------------------------------------------------------------------------------------
+
+def clean_category_column(categories, level=0):
+
+    """
+    Clean one level of the category hierarchy for a whole column.
+
+    The column is factorized so that each distinct category tree is split and cleaned
+    only once, then the results are mapped back to every row as a categorical.
+
+    Args:
+        categories (pd.Series): The category strings, e.g. df['product_category_tree'].
+        level (int): Index of the level to extract, 0 for the first level, -1 for the last one.
+
+    Returns:
+        pd.Series: A categorical Series with the same index, NaN where the level is missing.
+
+    Example:
+        df['category'] = ptt.clean_category_column(df['product_category_tree'])
+    """
+
+    categories = pd.Series(categories)
+    codes, uniques = pd.factorize(categories)
+
+    # Nettoyage une seule fois par arbre de catégories distinct
+    cleaned = [clean_category_level(category, level) for category in uniques]
+
+    # Plusieurs arbres peuvent donner la même catégorie nettoyée
+    cleaned_codes, cleaned_categories = pd.factorize(pd.Series(cleaned, dtype=object))
+    cleaned_codes = np.append(cleaned_codes, -1)
+    values = pd.Categorical.from_codes(cleaned_codes[codes], categories=cleaned_categories)
 
-    return result
+    return pd.Series(values, index=categories.index, name=categories.name)
@@ -3,9 +3,15 @@
     avec la méthode ACP (Analyse des composantes principale)
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 import matplotlib
+import matplotlib.colors
+import matplotlib.figure
+import matplotlib.patches
 import matplotlib.pyplot as plt
 import seaborn as sns
 
@@ -13,56 +19,130 @@ import seaborn as sns
 
 def correlation_graph(pca, 
                       x_y, 
-                      features) : 
+                      features,
+                      top_n=None,
+                      declutter=False,
+                      label_spacing=(0.12, 0.05),
+                      figsize=(10, 9),
+                      output=None,
+                      show=True) : 
     """Affiche le graphe des correlations
 
+    Toutes les flèches sont tracées en un seul appel (quiver), avec la même géométrie que
+    les flèches ax.arrow d'origine, et seuls les `top_n` features de plus forte contribution
+    sont dessinés : le temps de rendu dépend du nombre de features affichés, pas du nombre
+    total de features. Par défaut, tous les features et tous les labels sont affichés.
+
     Positional arguments : 
     -----------------------------------
     pca : sklearn.decomposition.PCA : notre objet PCA qui a été fit
     x_y : list ou tuple : le couple x,y des plans à afficher, exemple [0,1] pour F1, F2
     features : list ou tuple : la liste des features (ie des dimensions) à représenter
+
+    Optional arguments : 
+    -------------------------------------
+    top_n : int : nombre de features affichés, ceux dont la flèche est la plus longue sur le plan, default = None (tous)
+    declutter : bool : ne pas afficher les labels qui chevauchent celui d'une flèche plus longue, default = False
+    label_spacing : tuple : largeur et hauteur (unités des axes) réservées à chaque label, default = (0.12, 0.05)
+    figsize : list ou tuple : taille de la figure en inches, default = (10, 9)
+    output : str : fichier où enregistrer la figure (.png, .svg...), sans l'afficher, default = None
+    show : bool : afficher la figure (ignoré si output est donné), default = True
+
+    Returns : 
+    -------------------------------------
+    fig : matplotlib.figure.Figure : la figure
     """
 
     # Extrait x et y 
     x,y=x_y
 
-    # Taille de l'image (en inches)
-    fig, ax = plt.subplots(figsize=(10, 9))
-
-    # Pour chaque composante : 
-    for i in range(0, pca.components_.shape[1]):
-
-        # Les flèches
-        ax.arrow(0,0, 
-                pca.components_[x, i],  
-                pca.components_[y, i],  
-                head_width=0.07,
-                head_length=0.07, 
-                width=0.02, )
-
-        # Les labels
-        plt.text(pca.components_[x, i] + 0.05,
-                pca.components_[y, i] + 0.05,
-                features[i])
-        
+    # Sans affichage, la figure est créée hors pyplot : aucun backend graphique n'est nécessaire
+    if output is not None:
+        fig = matplotlib.figure.Figure(figsize=figsize)
+        ax = fig.add_subplot()
+    else:
+        fig, ax = plt.subplots(figsize=figsize)
+
+    _draw_correlation(ax, pca, x, y, features, top_n, declutter, label_spacing)
+
+    # Display
+    if output is not None:
+        fig.savefig(output, bbox_inches='tight')
+    elif show:
+        plt.show(block=False)
+    return fig
+
+#-----------------------------------------------------------------------------------------
+
+def _draw_correlation(ax, pca, x, y, features, top_n=None, declutter=False, label_spacing=(0.12, 0.05)):
+    """
+    Dessine le cercle des corrélations du plan (x, y) sur ax (voir correlation_graph).
+    """
+    # Coordonnées des features sur le plan, et longueur de chaque flèche
+    loadings = np.asarray(pca.components_)[[x, y]]
+    norms = np.hypot(loadings[0], loadings[1])
+    features = np.asarray(features, dtype=object)
+
+    # Sélection des top_n features les plus contributifs, du plus long au plus court
+    if top_n is not None and top_n < len(norms):
+        selected = np.argpartition(-norms, top_n - 1)[:top_n]
+    else:
+        selected = np.arange(len(norms))
+    selected = selected[np.argsort(-norms[selected], kind='stable')]
+    u, v = loadings[0, selected], loadings[1, selected]
+
+    # Les flèches, en un seul appel, dessinées comme ax.arrow(width=0.02, head_width=0.07, head_length=0.07) :
+    # largeur en unités des axes, et pointe ajoutée au bout du vecteur
+    lengths = np.hypot(u, v)
+    stretch = np.divide(lengths + _ARROW_HEAD, lengths, out=np.zeros_like(lengths), where=lengths > 0)
+    ax.quiver(np.zeros(len(u)), np.zeros(len(v)), u * stretch, v * stretch,
+              color='C0', edgecolor='black', linewidth=1,
+              angles='xy', scale_units='xy', scale=1, units='xy', width=_ARROW_WIDTH,
+              headwidth=_ARROW_HEAD / _ARROW_WIDTH, headlength=_ARROW_HEAD / _ARROW_WIDTH,
+              headaxislength=_ARROW_HEAD / _ARROW_WIDTH)
+
+    # Les labels, sans chevauchement si declutter
+    labelled = _declutter(u + 0.05, v + 0.05, label_spacing) if declutter else np.arange(len(u))
+    for i in labelled:
+        ax.text(u[i] + 0.05, v[i] + 0.05, features[selected[i]])
+
     # Affichage des lignes horizontales et verticales
-    plt.plot([-1, 1], [0, 0], color='grey', ls='--')
-    plt.plot([0, 0], [-1, 1], color='grey', ls='--')
+    ax.plot([-1, 1], [0, 0], color='grey', ls='--')
+    ax.plot([0, 0], [-1, 1], color='grey', ls='--')
 
     # Nom des axes, avec le pourcentage d'inertie expliqué
-    plt.xlabel('F{} ({}%)'.format(x+1, round(100*pca.explained_variance_ratio_[x],1)))
-    plt.ylabel('F{} ({}%)'.format(y+1, round(100*pca.explained_variance_ratio_[y],1)))
+    ax.set_xlabel('F{} ({}%)'.format(x+1, round(100*pca.explained_variance_ratio_[x],1)))
+    ax.set_ylabel('F{} ({}%)'.format(y+1, round(100*pca.explained_variance_ratio_[y],1)))
 
     # J'ai copié collé le code sans le lire
-    plt.title("Cercle des corrélations (F{} et F{})".format(x+1, y+1))
+    title = "Cercle des corrélations (F{} et F{})".format(x+1, y+1)
+    if len(selected) < len(norms):
+        title += " - {} features sur {}".format(len(selected), len(norms))
+    ax.set_title(title)
 
     # Le cercle 
     an = np.linspace(0, 2 * np.pi, 100)
-    plt.plot(np.cos(an), np.sin(an))  # Add a unit circle for scale
+    ax.plot(np.cos(an), np.sin(an))  # Add a unit circle for scale
 
-    # Axes et display
-    plt.axis('equal')
-    plt.show(block=False)
+    # Axes
+    ax.axis('equal')
+
+# Largeur et taille de pointe des flèches du cercle des corrélations (unités des axes)
+_ARROW_WIDTH = 0.02
+_ARROW_HEAD = 0.07
+
+#-----------------------------------------------------------------------------------------
+
+def _declutter(x, y, spacing):
+    """
+    Retourne les indices des labels à afficher : un seul label par case d'une grille de taille `spacing`.
+
+    Les labels sont supposés triés par priorité décroissante : dans chaque case, seul le
+    premier est conservé.
+    """
+    cells = np.stack([np.floor(np.asarray(x) / spacing[0]), np.floor(np.asarray(y) / spacing[1])], axis=1)
+    _, first = np.unique(cells, axis=0, return_index=True)
+    return np.sort(first)
 
 #-----------------------------------------------------------------------------------------
 
@@ -74,10 +154,23 @@ def display_factorial_planes(   X_projected,
                                 alpha=1,
                                 figsize=[10,8], 
                                 marker=".",
-                                zoom_factor=1 ):
+                                zoom_factor=1,
+                                density=None,
+                                density_threshold=200_000,
+                                bins=400,
+                                max_labels=None,
+                                label_index=None,
+                                output=None,
+                                show=True ):
     """
     Affiche la projection des individus
 
+    Au delà de `density_threshold` individus, les points ne sont plus dessinés un par un :
+    le plan est découpé en bins x bins cases, le nombre d'individus par case (et par
+    cluster) est compté par blocs avec NumPy, puis affiché comme une image de densité
+    coloriée par le cluster majoritaire de chaque case. La mémoire utilisée dépend du
+    nombre de cases et de clusters, pas du nombre d'individus.
+
     Positional arguments : 
     -------------------------------------
     X_projected : np.array, pd.DataFrame, list of list : la matrice des points projetés
@@ -91,10 +184,21 @@ def display_factorial_planes(   X_projected,
     alpha : float in [0,1] : paramètre de transparence, 0=100% transparent, 1=0% transparent, default = 1
     figsize : list ou tuple : couple width, height qui définit la taille de la figure en inches, default = [10,8] 
     marker : str : le type de marker utilisé pour représenter les individus, points croix etc etc, default = "."
+    density : bool : affichage en densité, default = None (automatique au delà de density_threshold individus)
+    density_threshold : int : nombre d'individus à partir duquel la densité est utilisée, default = 200_000
+    bins : int : nombre de cases par axe pour la densité, default = 400
+    max_labels : int : nombre maximal de labels affichés, tirés au hasard parmi les individus, default = None (tous, 1000 en mode densité)
+    label_index : list ou np.array : indices des individus dont le label est affiché (à la place du tirage), default = None
+    output : str : fichier où enregistrer la figure (.png, .svg...), sans l'afficher, default = None
+    show : bool : afficher la figure (ignoré si output est donné), default = True
+
+    Returns : 
+    -------------------------------------
+    fig : matplotlib.figure.Figure : la figure
     """
 
-    # Transforme X_projected en np.array
-    X_ = np.array(X_projected)
+    # np.asarray évite la copie quand X_projected est déjà un tableau (ou un DataFrame numérique)
+    X_ = np.asarray(X_projected)
 
     # On définit la forme de la figure si elle n'a pas été donnée
     if not figsize: 
@@ -116,17 +220,49 @@ def display_factorial_planes(   X_projected,
 
     # on définit x et y 
     x, y = x_y
+    n_points = X_.shape[0]
+    if density is None:
+        density = n_points > density_threshold
+
+    # Initialisation de la figure (hors pyplot si elle est seulement enregistrée)
+    if output is not None:
+        fig = matplotlib.figure.Figure(figsize=figsize)
+        ax = fig.add_subplot()
+    else:
+        fig, ax = plt.subplots(1, 1, figsize=figsize)
+
+    # Valeur x max et y max
+    x_max = _abs_max(X_[:, x]) *zoom_factor
+    y_max = _abs_max(X_[:, y]) *zoom_factor
+
+    # Les points
+    if density:
+        _plot_density(ax, X_[:, x], X_[:, y], _cluster_colors(clusters), (x_max, y_max), bins, alpha)
+    else:
+        # On vérifie s'il y a des clusters ou non
+        c = None if clusters is None else clusters
+
+        # plt.scatter(   X_[:, x], X_[:, y], alpha=alpha, 
+        #                     c=c, cmap="Set1", marker=marker)
+        sns.scatterplot(data=None, x=X_[:, x], y=X_[:, y], hue=c, s=10, palette="viridis", ax=ax)
 
-    # Initialisation de la figure       
-    fig, ax = plt.subplots(1, 1, figsize=figsize)
+    _decorate_projection(ax, X_, x, y, pca, (x_max, y_max), labels, alpha,
+                         _max_labels(max_labels, density), label_index)
 
-    # On vérifie s'il y a des clusters ou non
-    c = None if clusters is None else clusters
- 
-    # Les points    
-    # plt.scatter(   X_[:, x], X_[:, y], alpha=alpha, 
-    #                     c=c, cmap="Set1", marker=marker)
-    sns.scatterplot(data=None, x=X_[:, x], y=X_[:, y], hue=c, s=10, palette="viridis")
+    # Display
+    if output is not None:
+        fig.savefig(output, bbox_inches='tight')
+    elif show:
+        plt.show()
+    return fig
+
+#-----------------------------------------------------------------------------------------
+
+def _decorate_projection(ax, X_, x, y, pca, extent, labels, alpha=1, max_labels=None, label_index=None):
+    """
+    Ajoute à la projection du plan (x, y) les noms des axes, les bornes, les axes du repère, les labels et le titre.
+    """
+    x_max, y_max = extent
 
     # Si la variable pca a été fournie, on peut calculer le % de variance de chaque axe 
     if pca : 
@@ -139,24 +275,573 @@ def display_factorial_planes(   X_projected,
     ax.set_xlabel(f'F{x+1} {v1}')
     ax.set_ylabel(f'F{y+1} {v2}')
 
-    # Valeur x max et y max
-    x_max = np.abs(X_[:, x]).max() *zoom_factor
-    y_max = np.abs(X_[:, y]).max() *zoom_factor
-
     # On borne x et y 
     ax.set_xlim(left=-x_max, right=x_max)
     ax.set_ylim(bottom= -y_max, top=y_max)
 
     # Affichage des lignes horizontales et verticales
-    plt.plot([-x_max, x_max], [0, 0], color='grey', alpha=alpha)
-    plt.plot([0,0], [-y_max, y_max], color='grey', alpha=alpha)
+    ax.plot([-x_max, x_max], [0, 0], color='grey', alpha=alpha)
+    ax.plot([0,0], [-y_max, y_max], color='grey', alpha=alpha)
 
-    # Affichage des labels des points
+    # Affichage des labels des points, limité à un sous-ensemble
     if len(labels) : 
-        # j'ai copié collé la fonction sans la lire
-        for i,(_x,_y) in enumerate(X_[:,[x,y]]):
-            plt.text(_x, _y+0.05, labels[i], fontsize='14', ha='center',va='center') 
+        for i in _label_subset(len(labels), max_labels, label_index):
+            ax.text(X_[i, x], X_[i, y]+0.05, labels[i], fontsize='14', ha='center',va='center') 
+
+    # Titre
+    ax.set_title(f"Projection des produits (sur F{x+1} et F{y+1})")
+
+#-----------------------------------------------------------------------------------------
+
+def _abs_max(values):
+    """
+    Retourne max(|values|) sans créer de tableau intermédiaire de la taille de values.
+    """
+    return max(float(values.max()), -float(values.min()))
+
+#-----------------------------------------------------------------------------------------
+
+def _label_subset(n_labels, max_labels=None, label_index=None, seed=0):
+    """
+    Retourne les indices des individus dont le label est affiché.
+
+    label_index est utilisé tel quel s'il est donné ; sinon tous les individus si leur nombre
+    ne dépasse pas max_labels, et un tirage aléatoire (reproductible) de max_labels individus au delà.
+    """
+    if label_index is not None:
+        return np.asarray(label_index)
+    if max_labels is None or n_labels <= max_labels:
+        return np.arange(n_labels)
+    return np.sort(np.random.default_rng(seed).choice(n_labels, size=max_labels, replace=False))
+
+# Nombre de labels affichés par défaut en mode densité (en nuage de points, tous les labels sont affichés)
+_DENSITY_MAX_LABELS = 1000
+
+def _max_labels(max_labels, density):
+    """
+    Limite de labels effective : max_labels s'il est donné, sinon aucune limite hors mode densité.
+    """
+    if max_labels is None and density:
+        return _DENSITY_MAX_LABELS
+    return max_labels
+
+#-----------------------------------------------------------------------------------------
+
+def _density_grid(x_values, y_values, codes, n_clusters, extent, bins, chunksize=1_000_000):
+    """
+    Compte les individus par case de la grille (et par cluster), par blocs de `chunksize` lignes.
+
+    Returns : 
+    -------------------------------------
+    counts : np.array : tableau (n_clusters, bins, bins) des effectifs, indexé [cluster, ligne (y), colonne (x)]
+    """
+    x_max, y_max = extent
+    counts = np.zeros(n_clusters * bins * bins, dtype=np.int64)
+    for start in range(0, len(x_values), chunksize):
+        stop = start + chunksize
+        # Case de chaque point, les points hors du cadre (zoom) sont ignorés
+        col = np.floor((np.asarray(x_values[start:stop], dtype=np.float64) + x_max) / (2 * x_max) * bins).astype(np.int64)
+        row = np.floor((np.asarray(y_values[start:stop], dtype=np.float64) + y_max) / (2 * y_max) * bins).astype(np.int64)
+        # Un point exactement sur le bord droit ou haut reste dans la dernière case
+        col[col == bins] = bins - 1
+        row[row == bins] = bins - 1
+        inside = (col >= 0) & (col < bins) & (row >= 0) & (row < bins)
+        cells = row * bins + col
+        if codes is not None:
+            cells += codes[start:stop] * (bins * bins)
+        counts += np.bincount(cells[inside], minlength=len(counts))
+    return counts.reshape(n_clusters, bins, bins)
+
+#-----------------------------------------------------------------------------------------
+
+def _cluster_colors(clusters):
+    """
+    Code de chaque individu, noms des clusters et couleur de chaque cluster (palette viridis), ou None sans clusters.
+    """
+    if clusters is None:
+        return None
+    codes, names = pd.factorize(np.asarray(clusters), sort=True)
+    palette = np.array(sns.color_palette("viridis", len(names))).reshape(-1, 3)
+
+    # Les individus sans cluster (NaN, code -1) forment une catégorie explicite, en gris
+    missing = codes < 0
+    if missing.any():
+        codes = np.where(missing, len(names), codes)
+        names = np.append(np.asarray(names, dtype=object), 'NaN')
+        palette = np.vstack((palette, matplotlib.colors.to_rgb('lightgrey')))
+    return codes, names, palette
+
+#-----------------------------------------------------------------------------------------
+
+def _plot_density(ax, x_values, y_values, cluster_colors, extent, bins, alpha=1):
+    """
+    Affiche la densité des individus : couleur du cluster majoritaire de chaque case,
+    opacité croissante (échelle log) avec le nombre d'individus.
+    """
+    x_max, y_max = extent
+    # Un axe constant (max = 0) donnerait une grille vide
+    extent = (x_max or 1.0, y_max or 1.0)
+    image_extent = (-extent[0], extent[0], -extent[1], extent[1])
+
+    if cluster_colors is None:
+        counts = _density_grid(x_values, y_values, None, 1, extent, bins)[0]
+        image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', extent=image_extent, aspect='auto',
+                          cmap='viridis', norm=matplotlib.colors.LogNorm(), alpha=alpha, interpolation='nearest')
+        ax.figure.colorbar(image, ax=ax, label="nombre d'individus")
+        return
+
+    codes, names, palette = cluster_colors
+    counts = _density_grid(x_values, y_values, codes, len(names), extent, bins)
+    total = counts.sum(axis=0)
+    dominant = counts.argmax(axis=0)
+
+    # Image RGBA : couleur du cluster majoritaire, opacité en log du nombre d'individus
+    rgba = np.zeros((bins, bins, 4))
+    rgba[..., :3] = palette[dominant]
+    rgba[..., 3] = alpha * np.log1p(total) / np.log1p(max(total.max(), 1))
+    rgba[total == 0, 3] = 0
+    ax.imshow(rgba, origin='lower', extent=image_extent, aspect='auto', interpolation='nearest')
+
+    handles = [matplotlib.patches.Patch(color=palette[i], label=str(name)) for i, name in enumerate(names)]
+    ax.legend(handles=handles, title="clusters", loc='best')
+
+#-----------------------------------------------------------------------------------------
+
+class _PcaSummary:
+    """
+    Ce que les graphes utilisent d'un objet PCA : léger à envoyer aux processus d'export.
+    """
+
+    def __init__(self, pca):
+        self.components_ = np.asarray(pca.components_)
+        self.explained_variance_ratio_ = np.asarray(pca.explained_variance_ratio_)
+
+#-----------------------------------------------------------------------------------------
+
+def component_pairs(n_components):
+    """
+    Retourne les plans factoriels successifs (F1, F2), (F3, F4)... pour n_components composantes.
+    """
+    return [(i, i + 1) for i in range(0, n_components - 1, 2)]
+
+#-----------------------------------------------------------------------------------------
+
+def _prepare_planes(pca, X_projected, pairs, features, labels, clusters, zoom_factor):
+    """
+    Précalculs communs à tous les plans : matrice projetée, bornes de chaque composante, couleurs des clusters.
+    """
+    X_ = np.asarray(X_projected)
+    used = sorted({axis for pair in pairs for axis in pair})
+    if used and used[-1] >= X_.shape[1]:
+        raise AttributeError("la variable axis n'est pas bonne")
 
-    # Titre et display
-    plt.title(f"Projection des produits (sur F{x+1} et F{y+1})")
-    plt.show()
+    # max(|X|) de chaque composante en une passe, sans copie de X
+    abs_max = np.maximum(X_.max(axis=0), -X_.min(axis=0)).astype(np.float64) * zoom_factor
+
+    if features is None:
+        features = [f"V{i+1}" for i in range(np.asarray(pca.components_).shape[1])]
+
+    return {'pca': _PcaSummary(pca),
+            'X': X_,
+            'abs_max': abs_max,
+            'features': np.asarray(features, dtype=object),
+            'labels': [] if labels is None else labels,
+            'cluster_colors': _cluster_colors(clusters)}
+
+#-----------------------------------------------------------------------------------------
+
+def _draw_plane(ax, shared, kind, pair, options):
+    """
+    Dessine un plan (cercle des corrélations ou projection) à partir des précalculs communs.
+    """
+    x, y = pair
+    if kind == 'correlation':
+        _draw_correlation(ax, shared['pca'], x, y, shared['features'],
+                          top_n=options['top_n'], declutter=options['declutter'])
+        return
+
+    X_ = shared['X']
+    extent = (shared['abs_max'][x], shared['abs_max'][y])
+    cluster_colors = shared['cluster_colors']
+    density = options['density']
+    if density is None:
+        density = len(X_) > options['density_threshold']
+
+    if density:
+        _plot_density(ax, X_[:, x], X_[:, y], cluster_colors, extent, options['bins'], options['alpha'])
+    elif cluster_colors is None:
+        ax.scatter(X_[:, x], X_[:, y], s=10, color=sns.color_palette("viridis", 1)[0], marker=options['marker'])
+    else:
+        codes, names, palette = cluster_colors
+        ax.scatter(X_[:, x], X_[:, y], s=10, c=palette[codes], marker=options['marker'])
+        handles = [matplotlib.patches.Patch(color=palette[i], label=str(name)) for i, name in enumerate(names)]
+        ax.legend(handles=handles, title="clusters", loc='best')
+
+    _decorate_projection(ax, X_, x, y, shared['pca'], extent, shared['labels'], options['alpha'],
+                         _max_labels(options['max_labels'], density), options['label_index'])
+
+#-----------------------------------------------------------------------------------------
+
+# Précalculs et options partagés par les processus d'export (envoyés une fois par processus)
+_WORKER_STATE = None
+
+def _set_worker_state(shared, options):
+    global _WORKER_STATE
+    _WORKER_STATE = (shared, options)
+
+def _init_worker(shared, options):
+    # Initialisation des processus d'export seulement : le backend de l'appelant n'est pas modifié
+    matplotlib.use('Agg')
+    _set_worker_state(shared, options)
+
+def _export_plane(task):
+    """
+    Dessine un plan dans une figure hors pyplot (backend Agg) et l'enregistre.
+    """
+    kind, pair, path = task
+    shared, options = _WORKER_STATE
+    fig = matplotlib.figure.Figure(figsize=options['figsize'])
+    _draw_plane(fig.add_subplot(), shared, kind, pair, options)
+    fig.savefig(path, bbox_inches='tight')
+    return path
+
+#-----------------------------------------------------------------------------------------
+
+def display_all_factorial_planes(pca,
+                                 X_projected,
+                                 pairs=None,
+                                 features=None,
+                                 labels=None,
+                                 clusters=None,
+                                 kinds=('correlation', 'projection'),
+                                 output=None,
+                                 output_dir=None,
+                                 fmt='png',
+                                 n_jobs=1,
+                                 figsize=(8, 7),
+                                 show=True,
+                                 top_n=None,
+                                 declutter=False,
+                                 alpha=1,
+                                 marker='.',
+                                 zoom_factor=1,
+                                 density=None,
+                                 density_threshold=200_000,
+                                 bins=400,
+                                 max_labels=None,
+                                 label_index=None):
+    """
+    Affiche ou exporte tous les plans factoriels demandés en une fois
+
+    La matrice projetée, les bornes de chaque composante et les couleurs des clusters sont
+    calculées une seule fois pour tous les plans. Sans output_dir, les plans sont dessinés
+    dans une grille (une ligne par plan, une colonne par type de graphe). Avec output_dir,
+    chaque graphe est enregistré dans son propre fichier, en parallèle sur n_jobs processus
+    avec le backend Agg.
+
+    Positional arguments : 
+    -------------------------------------
+    pca : sklearn.decomposition.PCA : notre objet PCA qui a été fit
+    X_projected : np.array, pd.DataFrame, list of list : la matrice des points projetés
+
+    Optional arguments : 
+    -------------------------------------
+    pairs : list : les plans à afficher, exemple [(0,1), (2,3)], default = None (F1-F2, F3-F4... jusqu'à la dernière composante)
+    features : list ou tuple : la liste des features pour les cercles des corrélations, default = None (V1, V2...)
+    labels : list ou tuple : les labels des individus à projeter, default = None
+    clusters : list ou tuple : la liste des clusters auquel appartient chaque individu, default = None
+    kinds : tuple : graphes à produire pour chaque plan, 'correlation' et/ou 'projection', default = les deux
+    output : str : fichier où enregistrer la grille, sans l'afficher, default = None
+    output_dir : str : dossier où enregistrer un fichier par graphe (kind_Fx_Fy.fmt), default = None
+    fmt : str : format des fichiers de output_dir ('png', 'svg'...), default = 'png'
+    n_jobs : int : nombre de processus pour l'export dans output_dir, -1 pour tous les coeurs, default = 1
+    figsize : list ou tuple : taille (inches) de chaque graphe, default = (8, 7)
+    show : bool : afficher la grille (ignoré si output ou output_dir est donné), default = True
+    top_n, declutter : voir correlation_graph
+    alpha, marker, zoom_factor, density, density_threshold, bins, max_labels, label_index : voir display_factorial_planes
+
+    Returns : 
+    -------------------------------------
+    fig : matplotlib.figure.Figure : la grille, ou la liste des fichiers créés si output_dir est donné
+    """
+    unknown = set(kinds) - {'correlation', 'projection'}
+    if unknown:
+        raise AttributeError(f"types de graphe inconnus : {sorted(unknown)}")
+
+    if pairs is None:
+        pairs = component_pairs(np.asarray(pca.components_).shape[0])
+    pairs = [tuple(pair) for pair in pairs]
+
+    shared = _prepare_planes(pca, X_projected, pairs, features, labels, clusters, zoom_factor)
+    options = {'figsize': figsize, 'top_n': top_n, 'declutter': declutter, 'alpha': alpha, 'marker': marker,
+               'density': density, 'density_threshold': density_threshold, 'bins': bins,
+               'max_labels': max_labels, 'label_index': label_index}
+
+    # Un fichier par graphe
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        tasks = [(kind, pair, os.path.join(output_dir, f"{kind}_F{pair[0]+1}_F{pair[1]+1}.{fmt}"))
+                 for pair in pairs for kind in kinds]
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs <= 1 or len(tasks) <= 1:
+            _set_worker_state(shared, options)
+            try:
+                return [_export_plane(task) for task in tasks]
+            finally:
+                _set_worker_state(None, None)
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), initializer=_init_worker,
+                                 initargs=(shared, options)) as executor:
+            return list(executor.map(_export_plane, tasks))
+
+    # Une grille : une ligne par plan, une colonne par type de graphe
+    grid_size = (figsize[0] * len(kinds), figsize[1] * len(pairs))
+    if output is not None:
+        fig = matplotlib.figure.Figure(figsize=grid_size)
+    else:
+        fig = plt.figure(figsize=grid_size)
+    axes = fig.subplots(len(pairs), len(kinds), squeeze=False)
+    for row, pair in enumerate(pairs):
+        for col, kind in enumerate(kinds):
+            _draw_plane(axes[row, col], shared, kind, pair, options)
+    fig.tight_layout()
+
+    if output is not None:
+        fig.savefig(output, bbox_inches='tight')
+    elif show:
+        plt.show()
+    return fig
+
+#-----------------------------------------------------------------------------------------
+
+class PcaSpectrum:
+    """
+    Spectre d'une ACP (variance expliquée par composante), calculé une seule fois
+
+    L'ACP est ajustée une fois avec le rang maximal ; le choix du nombre de composantes
+    (seuil d'inertie, coude, analyse parallèle) et l'éboulis des valeurs propres sont
+    ensuite calculés à partir du spectre gardé en mémoire, sans nouvel ajustement.
+
+    Positional arguments : 
+    -------------------------------------
+    explained_variance_ratio : np.array : part de l'inertie totale expliquée par chaque composante
+
+    Optional arguments : 
+    -------------------------------------
+    n_samples : int : nombre d'individus, nécessaire à l'analyse parallèle, default = None
+    n_features : int : nombre de features, nécessaire à l'analyse parallèle, default = None
+    pca : objet PCA d'où vient le spectre (sklearn ou OutOfCorePCA), default = None
+
+    Exemple : 
+    -------------------------------------
+    spectrum = PcaSpectrum.fit(X_scaled)
+    k = spectrum.plot(threshold=0.8)
+    k_parallel = spectrum.parallel_analysis()
+    """
+
+    def __init__(self, explained_variance_ratio, n_samples=None, n_features=None, pca=None):
+        self.explained_variance_ratio_ = np.asarray(explained_variance_ratio, dtype=np.float64)
+        self.cumulative_ = np.cumsum(self.explained_variance_ratio_)
+        self.n_samples = n_samples
+        self.n_features = n_features
+        self.pca = pca
+
+    @classmethod
+    def from_pca(cls, pca, n_samples=None):
+        """
+        Spectre d'une ACP déjà ajustée (sklearn.decomposition.PCA ou OutOfCorePCA).
+        """
+        n_samples = n_samples or getattr(pca, 'n_samples_', None)
+        n_features = getattr(pca, 'n_features_in_', None) or np.asarray(pca.components_).shape[1]
+        return cls(pca.explained_variance_ratio_, n_samples=n_samples, n_features=n_features, pca=pca)
+
+    @classmethod
+    def fit(cls, X, max_components=None, **pca_kwargs):
+        """
+        Ajuste une seule ACP avec le rang maximal (ou max_components composantes) et retourne son spectre.
+
+        Optional arguments : 
+        -------------------------------------
+        max_components : int : nombre de composantes calculées, default = None (min(n_individus, n_features))
+        pca_kwargs : options de sklearn.decomposition.PCA (svd_solver, random_state...)
+        """
+        from sklearn.decomposition import PCA
+
+        pca = PCA(n_components=max_components, **pca_kwargs).fit(X)
+        return cls.from_pca(pca)
+
+    def __len__(self):
+        return len(self.explained_variance_ratio_)
+
+    def n_for_variance(self, threshold=0.9):
+        """
+        Plus petit nombre de composantes dont l'inertie cumulée atteint threshold (entre 0 et 1).
+        """
+        reached = np.flatnonzero(self.cumulative_ >= threshold - 1e-12)
+        if not len(reached):
+            raise ValueError(f"le seuil {threshold} n'est pas atteint avec les {len(self)} composantes calculées "
+                             f"({self.cumulative_[-1]:.3f})")
+        return int(reached[0]) + 1
+
+    def elbow(self):
+        """
+        Nombre de composantes au coude de la courbe d'inertie cumulée : point le plus éloigné
+        de la droite qui joint la première et la dernière composante (courbe normalisée sur [0, 1]).
+        """
+        n = len(self)
+        if n < 3:
+            return n
+        cumulative = self.cumulative_
+        x = np.linspace(0, 1, n)
+        y = (cumulative - cumulative[0]) / ((cumulative[-1] - cumulative[0]) or 1)
+        # Écart au dessus de la droite (0, 0) -> (1, 1)
+        return int((y - x).argmax()) + 1
+
+    def kaiser(self):
+        """
+        Nombre de composantes dont la variance dépasse la moyenne (critère de Kaiser, valeur propre > 1 pour des données centrées réduites).
+        """
+        n_features = self.n_features or len(self)
+        return int((self.explained_variance_ratio_ > 1 / n_features).sum())
+
+    def parallel_analysis(self, n_iter=20, quantile=0.95, method='auto', max_samples=20_000, random_state=None):
+        """
+        Analyse parallèle de Horn : on garde les composantes dont la part d'inertie dépasse celle
+        obtenue sur des données aléatoires de même taille (données centrées réduites).
+
+        La simulation décompose n_iter matrices aléatoires n x d : au delà de max_samples individus,
+        la méthode 'auto' utilise la borne de Marchenko-Pastur, qui est alors très proche de la simulation.
+
+        Optional arguments : 
+        -------------------------------------
+        n_iter : int : nombre de matrices aléatoires simulées, default = 20
+        quantile : float : quantile des parts d'inertie aléatoires utilisé comme seuil, default = 0.95
+        method : str : 'simulation', 'marchenko-pastur' (borne théorique, sans simulation), ou 'auto' (simulation jusqu'à max_samples individus, Marchenko-Pastur au delà), default = 'auto'
+        max_samples : int : nombre d'individus au delà duquel 'auto' ne simule plus, default = 20_000
+        random_state : int : graine des simulations, default = None
+
+        Returns : 
+        -------------------------------------
+        k : int : le nombre de composantes retenues
+        """
+        if self.n_samples is None or self.n_features is None:
+            raise ValueError("l'analyse parallèle nécessite n_samples et n_features")
+        n, d = self.n_samples, self.n_features
+        if method == 'auto':
+            method = 'simulation' if n <= max_samples else 'marchenko-pastur'
+
+        if method == 'marchenko-pastur':
+            # Plus grande valeur propre d'une matrice de corrélation aléatoire n x d (d valeurs propres de moyenne 1)
+            threshold = np.full(len(self), (1 + np.sqrt(d / n)) ** 2 / d)
+        elif method == 'simulation':
+            rng = np.random.default_rng(random_state)
+            n_values = min(len(self), n, d)
+            random_ratios = np.empty((n_iter, n_values))
+            for i in range(n_iter):
+                noise = rng.standard_normal((n, d))
+                noise -= noise.mean(axis=0)
+                noise /= noise.std(axis=0)
+                # Valeurs propres de la plus petite des deux matrices de Gram (moins coûteux qu'une SVD complète)
+                gram = noise.T @ noise if d <= n else noise @ noise.T
+                eigenvalues = np.linalg.eigvalsh(gram)[::-1]
+                random_ratios[i] = eigenvalues[:n_values] / eigenvalues.sum()
+            threshold = np.quantile(random_ratios, quantile, axis=0)
+        else:
+            raise ValueError(f"méthode inconnue : {method}")
+
+        # Les composantes sont retenues tant qu'elles dépassent le seuil
+        above = self.explained_variance_ratio_[:len(threshold)] > threshold
+        return int(len(above) if above.all() else above.argmin())
+
+    def select(self, method='variance', **kwargs):
+        """
+        Nombre de composantes selon la méthode : 'variance' (threshold=...), 'elbow', 'kaiser' ou 'parallel'.
+        """
+        if method == 'variance':
+            return self.n_for_variance(**kwargs)
+        if method == 'elbow':
+            return self.elbow()
+        if method == 'kaiser':
+            return self.kaiser()
+        if method == 'parallel':
+            return self.parallel_analysis(**kwargs)
+        raise ValueError(f"méthode inconnue : {method}")
+
+    def plot(self, threshold=0.9, k=None, max_components=None, figsize=(10, 6), output=None, show=True):
+        """
+        Affiche l'éboulis des valeurs propres et la courbe d'inertie cumulée, et retourne le nombre de composantes choisi.
+
+        Optional arguments : 
+        -------------------------------------
+        threshold : float : seuil d'inertie cumulée, tracé et utilisé si k n'est pas donné, default = 0.9
+        k : int : nombre de composantes à marquer (ex : spectrum.elbow()), default = None (n_for_variance(threshold))
+        max_components : int : nombre de composantes affichées, default = None (toutes)
+        figsize : list ou tuple : taille de la figure en inches, default = (10, 6)
+        output : str : fichier où enregistrer la figure (.png, .svg...), sans l'afficher, default = None
+        show : bool : afficher la figure (ignoré si output est donné), default = True
+
+        Returns : 
+        -------------------------------------
+        k : int : le nombre de composantes choisi
+        """
+        if k is None:
+            k = self.n_for_variance(threshold)
+        # k peut être nul (ex : analyse parallèle sur des données sans structure)
+        k_inertia = self.cumulative_[k - 1] if k > 0 else 0.0
+
+        n_shown = min(len(self), max_components or len(self))
+        ranks = np.arange(1, n_shown + 1)
+
+        if output is not None:
+            fig = matplotlib.figure.Figure(figsize=figsize)
+            ax = fig.add_subplot()
+        else:
+            fig, ax = plt.subplots(figsize=figsize)
+
+        # Éboulis : inertie de chaque composante, et courbe d'inertie cumulée
+        ax.bar(ranks, 100 * self.explained_variance_ratio_[:n_shown], color='lightsteelblue', label="inertie")
+        ax.plot(ranks, 100 * self.cumulative_[:n_shown], c='red', marker='o', markersize=3, label="inertie cumulée")
+
+        # Seuil et nombre de composantes choisi
+        if threshold is not None:
+            ax.axhline(100 * threshold, color='grey', ls='--', label=f"seuil {round(100 * threshold)} %")
+        ax.axvline(k, color='green', ls=':', label=f"k = {k} ({round(100 * k_inertia, 1)} %)")
+
+        ax.set_xlabel("rang de l'axe d'inertie")
+        ax.set_ylabel("pourcentage d'inertie")
+        ax.set_title("Eboulis des valeurs propres")
+        ax.legend(loc='center right')
+
+        if output is not None:
+            fig.savefig(output, bbox_inches='tight')
+        elif show:
+            plt.show(block=False)
+        return k
+
+#-----------------------------------------------------------------------------------------
+
+def scree_plot(pca, threshold=0.9, method='variance', output=None, show=True, **kwargs):
+    """
+    Affiche l'éboulis des valeurs propres d'une ACP déjà ajustée et retourne le nombre de composantes choisi
+
+    Positional arguments : 
+    -------------------------------------
+    pca : sklearn.decomposition.PCA ou OutOfCorePCA : l'ACP ajustée, idéalement avec le rang maximal
+
+    Optional arguments : 
+    -------------------------------------
+    threshold : float : seuil d'inertie cumulée, default = 0.9
+    method : str : choix de k, 'variance', 'elbow', 'kaiser' ou 'parallel' (voir PcaSpectrum.select), default = 'variance'
+    output : str : fichier où enregistrer la figure, sans l'afficher, default = None
+    show : bool : afficher la figure (ignoré si output est donné), default = True
+    kwargs : options de la méthode de choix (ex : n_iter, random_state pour 'parallel')
+
+    Returns : 
+    -------------------------------------
+    k : int : le nombre de composantes choisi
+    """
+    spectrum = PcaSpectrum.from_pca(pca)
+    if method == 'variance':
+        kwargs.setdefault('threshold', threshold)
+    k = spectrum.select(method, **kwargs)
+    return spectrum.plot(threshold=threshold, k=k, output=output, show=show)